@@ -0,0 +1,96 @@
+"""Compares the git log backends on a synthetic repository built with git fast-import.
+
+Usage: python -m benchmarks.backends [--commits N] [--authors N] [--repeat N] [--keep PATH]
+
+For each backend this reports the time git takes to produce the log, the time to parse it,
+and the size of the output.
+"""
+
+import argparse
+import os
+import random
+import shutil
+import subprocess
+import tempfile
+import time
+
+from src.gitcal import gitcommit
+from src.gitcal.logbackend import BACKENDS
+
+START_TIME = 1262304000 # 2010-01-01
+OFFSETS = ['+0000', '-0500', '+0530', '+0900']
+
+
+def fast_import_stream(commits, authors, rand):
+    timestamp = START_TIME
+    for idx in range(commits):
+        timestamp += rand.randrange(1, 1800)
+        author = idx % authors
+        yield (
+            'commit refs/heads/master\n'
+            'author Author %d <author%d@example.com> %d %s\n'
+            'committer Committer <committer@example.com> %d +0000\n'
+            'data 7\ncommit\n' % (author, author, timestamp, rand.choice(OFFSETS), timestamp)
+        ).encode('utf-8')
+
+def create_repo(path, commits, authors):
+    subprocess.check_call(['git', 'init', '-q', path])
+    args = ['git', '-C', path, 'fast-import', '--quiet']
+    with subprocess.Popen(args, stdin=subprocess.PIPE) as proc:
+        for chunk in fast_import_stream(commits, authors, random.Random(0)):
+            proc.stdin.write(chunk)
+    subprocess.check_call(['git', '-C', path, 'update-ref', 'HEAD', 'refs/heads/master'])
+    subprocess.check_call(['git', '-C', path, 'commit-graph', 'write', '--reachable'])
+
+def measure(backend, path, repeat):
+    git_time = None
+    parse_time = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        log = gitcommit.git_log(cwd=path, backend=backend)
+        elapsed = time.perf_counter() - start
+        git_time = elapsed if git_time is None else min(git_time, elapsed)
+
+        start = time.perf_counter()
+        count = sum(1 for _ in backend.iter_records(log.split(b'\n')))
+        elapsed = time.perf_counter() - start
+        parse_time = elapsed if parse_time is None else min(parse_time, elapsed)
+    return git_time, parse_time, len(log), count
+
+def main():
+    parser = argparse.ArgumentParser(description='compare git log backends')
+    parser.add_argument('--commits', type=int, default=200000)
+    parser.add_argument('--authors', type=int, default=300)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--keep', metavar='PATH',
+        help='build the repository at PATH and keep it, or reuse it if it exists'
+    )
+    argspace = parser.parse_args()
+
+    tmpdir = None
+    path = argspace.keep
+    if path is None:
+        tmpdir = tempfile.mkdtemp()
+        path = os.path.join(tmpdir, 'repo')
+    if not os.path.isdir(path):
+        create_repo(path, argspace.commits, argspace.authors)
+
+    try:
+        print('%16s  %9s  %9s  %9s  %12s  %9s' % (
+            'backend', 'git (s)', 'parse (s)', 'total (s)', 'bytes', 'commits'
+        ))
+        for name, backend in BACKENDS.items():
+            try:
+                git_time, parse_time, size, count = measure(backend, path, argspace.repeat)
+            except subprocess.CalledProcessError:
+                print('%16s  not supported by this git version' % name)
+                continue
+            print('%16s  %9.3f  %9.3f  %9.3f  %12d  %9d' % (
+                name, git_time, parse_time, git_time + parse_time, size, count
+            ))
+    finally:
+        if tmpdir is not None:
+            shutil.rmtree(tmpdir)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+"""Compares the memory used by a list of Commit objects against a CommitStore.
+
+Usage: python -m benchmarks.commit_memory [COUNT ...] [--max-list COUNT]
+"""
+
+import argparse
+import gc
+import tracemalloc
+
+from src.gitcal.commit import Commit
+from src.gitcal.commitstore import CommitStore
+
+AUTHOR_COUNT = 400
+START_TIME = 1262304000 # 2010-01-01
+
+
+def generate_records(count):
+    for idx in range(count):
+        # new string objects for every commit, the same as parsing git log output produces
+        shorthash = '%07x' % (idx * 2654435761 % 0xfffffff)
+        yield shorthash, START_TIME + idx * 37, 'author %d' % (idx % AUTHOR_COUNT)
+
+def build_list(count):
+    return [
+        Commit(shorthash, timestamp, name)
+        for shorthash, timestamp, name in generate_records(count)
+    ]
+
+def build_store(count, keep_hashes):
+    store = CommitStore(keep_hashes=keep_hashes)
+    for shorthash, timestamp, name in generate_records(count):
+        store.append(timestamp, name, shorthash)
+    return store
+
+def measure(fnc, *args):
+    gc.collect()
+    tracemalloc.start()
+    result = fnc(*args)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    gc.collect()
+    return current
+
+def main():
+    parser = argparse.ArgumentParser(description='measure commit representation memory usage')
+    parser.add_argument('counts', nargs='*', type=int, default=[100000, 1000000, 10000000])
+    parser.add_argument('--max-list', type=int, default=1000000,
+        help='largest count to build a List[Commit] for, larger counts are extrapolated'
+    )
+    argspace = parser.parse_args()
+
+    print('%10s  %14s  %14s  %14s  %8s' % (
+        'commits', 'List[Commit]', 'store+hashes', 'store', 'ratio'
+    ))
+
+    per_commit = None
+    for count in argspace.counts:
+        if count <= argspace.max_list:
+            list_bytes = measure(build_list, count)
+            per_commit = list_bytes / count
+            list_str = '%14d' % list_bytes
+        else:
+            list_bytes = per_commit * count if per_commit is not None else None
+            list_str = '%13d*' % list_bytes if list_bytes is not None else '%14s' % '-'
+
+        hashes_bytes = measure(build_store, count, True)
+        store_bytes = measure(build_store, count, False)
+
+        print('%10d  %s  %14d  %14d  %8s' % (
+            count,
+            list_str,
+            hashes_bytes,
+            store_bytes,
+            '%.1fx' % (list_bytes / store_bytes) if list_bytes is not None else '-'
+        ))
+
+    if any(map(lambda x: x > argspace.max_list, argspace.counts)):
+        print('* extrapolated from the largest measured list')
+
+if __name__ == '__main__':
+    main()
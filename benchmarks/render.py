@@ -0,0 +1,67 @@
+"""Measures how Table.draw_tables scales with the number of rows and tables.
+
+Usage: python -m benchmarks.render [--rows N ...] [--tables N ...] [--border]
+
+Render time divided by rows x tables should stay roughly constant as the output grows.
+"""
+
+import argparse
+import random
+import time
+
+from src.gitcal import gitcal
+from src.gitcal.table import CellInfo, Table
+from src.gitcal.tableconfig import TableConfig
+
+
+def create_table(rows, cols, border, rand):
+    cell_info = CellInfo(
+        width=4 if border else 2,
+        height=3 if border else 1,
+        has_border=border,
+        drawcell=gitcal.draw_cell_bordered if border else gitcal.draw_cell_unborder,
+        getval=gitcal.getval,
+        getclass=gitcal.getclass
+    )
+
+    tbl = Table(cell_info)
+    tbl.data = [ [ rand.choice([0, 0, 0, 1, 3, 12]) for _ in range(cols) ] for _ in range(rows) ]
+    tbl.row_labels = [ 'row %d' % idx for idx in range(rows) ]
+    tbl.label_left = True
+    tbl.config = TableConfig(color=True, num=True, threshold=4)
+    return tbl
+
+def main():
+    parser = argparse.ArgumentParser(description='measure table rendering time')
+    parser.add_argument('--rows', nargs='+', type=int, default=[250, 500, 1000, 2000, 4000])
+    parser.add_argument('--tables', nargs='+', type=int, default=[1, 4, 16])
+    parser.add_argument('--cols', type=int, default=7)
+    parser.add_argument('--border', action='store_true', default=False)
+    argspace = parser.parse_args()
+
+    rand = random.Random(0)
+    print('%8s  %8s  %12s  %10s  %12s' % (
+        'rows', 'tables', 'output bytes', 'seconds', 'us/row/table'
+    ))
+
+    for tbl_count in argspace.tables:
+        for rows in argspace.rows:
+            tables = [
+                create_table(rows, argspace.cols, argspace.border, rand)
+                for _ in range(tbl_count)
+            ]
+
+            start = time.perf_counter()
+            output = Table.draw_tables(tables)
+            elapsed = time.perf_counter() - start
+
+            print('%8d  %8d  %12d  %10.4f  %12.2f' % (
+                rows,
+                tbl_count,
+                len(output),
+                elapsed,
+                elapsed * 1e6 / (rows * tbl_count)
+            ))
+
+if __name__ == '__main__':
+    main()
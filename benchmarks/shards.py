@@ -0,0 +1,97 @@
+"""Measures whether reading the log in shards is faster than reading it with one git process.
+
+Usage: python -m benchmarks.shards [--shards N ...] [--commits N] [--repeat N]
+                                   [--keep PATH | --repo PATH]
+
+For each shard count this reports the time to find the shard boundaries, the time of the slowest
+shard and of all shards together when run one after another, and the wall time when they run in
+parallel. The boundaries plus the slowest shard is the wall time to expect with one CPU per shard,
+which is what the parallel time approaches on a machine with enough CPUs.
+"""
+
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+import os
+import shutil
+import tempfile
+import time
+
+from src.gitcal import gitcommit
+from benchmarks.backends import create_repo
+
+
+def best_time(func, repeat):
+    best = None
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+def measure(path, shards, repeat):
+    bounds_time, ranges = best_time(lambda: gitcommit.get_shard_ranges(shards, cwd=path), repeat)
+    if len(ranges) == 0:
+        return None
+
+    shard_times = [
+        best_time(lambda x=args: gitcommit.git_log(*x, cwd=path), repeat)[0]
+        for args in ranges
+    ]
+
+    def run_parallel():
+        with ThreadPoolExecutor(max_workers=len(ranges)) as executor:
+            return list(executor.map(lambda args: gitcommit.git_log(*args, cwd=path), ranges))
+    parallel_time, _ = best_time(
+        lambda: (gitcommit.get_shard_ranges(shards, cwd=path), run_parallel()),
+        repeat
+    )
+    return bounds_time, max(shard_times), sum(shard_times), parallel_time
+
+def main():
+    parser = argparse.ArgumentParser(description='compare sharded and single process log reads')
+    parser.add_argument('--shards', type=int, nargs='+', default=[2, 4, 8])
+    parser.add_argument('--commits', type=int, default=300000)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--keep', metavar='PATH',
+        help='build the repository at PATH and keep it, or reuse it if it exists'
+    )
+    parser.add_argument('--repo', metavar='PATH',
+        help='measure an existing repository instead of building one'
+    )
+    argspace = parser.parse_args()
+
+    tmpdir = None
+    path = argspace.repo if argspace.repo is not None else argspace.keep
+    if path is None:
+        tmpdir = tempfile.mkdtemp()
+        path = os.path.join(tmpdir, 'repo')
+    if not os.path.isdir(path):
+        create_repo(path, argspace.commits, 300)
+
+    try:
+        single_time, _ = best_time(lambda: gitcommit.git_log(cwd=path), argspace.repeat)
+        print('%d cpus, single process %.3f s' % (os.cpu_count() or 1, single_time))
+        print('%6s  %10s  %13s  %13s  %12s  %12s  %8s' % (
+            'shards', 'bounds (s)', 'slowest (s)', 'serial (s)',
+            'parallel (s)', 'estimate (s)', 'speedup'
+        ))
+        for shards in argspace.shards:
+            result = measure(path, shards, argspace.repeat)
+            if result is None:
+                print('%6d  not split, the repository has no commit-graph' % shards)
+                continue
+
+            bounds_time, slowest_time, serial_time, parallel_time = result
+            estimate = bounds_time + slowest_time
+            print('%6d  %10.3f  %13.3f  %13.3f  %12.3f  %12.3f  %7.2fx' % (
+                shards, bounds_time, slowest_time, serial_time,
+                parallel_time, estimate, single_time / estimate
+            ))
+    finally:
+        if tmpdir is not None:
+            shutil.rmtree(tmpdir)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,234 @@
+"""Measures the parse, bucket, collapse and render stages on synthetic commit histories.
+
+Usage: python -m benchmarks.stages [--sizes N ...] [--distributions NAME ...] [--output FILE]
+                                   [--no-memory] [--compare FILE]
+
+Each stage is timed on its own, and then all of them together the way gitcal runs them.
+Results are written as JSON, one entry per distribution, size and stage, with the time in
+seconds and the peak memory allocated by Python in bytes. Two result files can be compared
+with --compare to find regressions between releases.
+"""
+
+import argparse
+import copy
+import json
+import platform
+import random
+import sys
+import time
+import tracemalloc
+
+from src.gitcal import __version__, args, gitcal, gitcommit
+from src.gitcal.bucket import BucketPlan
+from src.gitcal.commitsource import CommitSource
+from src.gitcal.table import Table
+
+START_TIME = 1262304000 # 2010-01-01
+SPAN = 5 * 365 * 86400
+OFFSETS = [b'+0000', b'-0500', b'+0530', b'+0100']
+
+# the tables drawn for every history, separated by -T like on the command line
+TABLE_ARGS = [
+    '-n', 'days',
+    '-T', '-n', 'hours', '-d', '1h', '--collapse', '2',
+    '-T', '-n', 'author', '-d', '1d', '-f', 'author 0',
+]
+
+STAGES = ['parse', 'bucket', 'collapse', 'render', 'end_to_end']
+
+
+def uniform_times(count, rand):
+    return [ START_TIME + rand.randrange(SPAN) for _ in range(count) ]
+
+def bursty_times(count, rand):
+    # most commits land in short bursts of a few hours around release days
+    centers = [ START_TIME + rand.randrange(SPAN) for _ in range(max(1, count // 500)) ]
+    return [ rand.choice(centers) + int(rand.expovariate(1 / 7200)) for _ in range(count) ]
+
+def long_gap_times(count, rand):
+    # two active periods with years of nothing in between
+    half = count // 2
+    return (
+        [ START_TIME + rand.randrange(SPAN // 10) for _ in range(half) ]
+        + [ START_TIME + SPAN - rand.randrange(SPAN // 10) for _ in range(count - half) ]
+    )
+
+DISTRIBUTIONS = {
+    'uniform': (uniform_times, 20),
+    'bursty': (bursty_times, 20),
+    'many_authors': (uniform_times, None),
+    'long_gap': (long_gap_times, 20),
+}
+
+def generate_log(distribution, count, seed=0):
+    """Returns git log output lines for a synthetic history, newest commit first."""
+    rand = random.Random(seed)
+    fnc_times, author_count = DISTRIBUTIONS[distribution]
+    if author_count is None:
+        author_count = max(20, count // 10)
+
+    times = fnc_times(count, rand)
+    times.sort(reverse=True)
+    return [
+        b'%07x %d %s author %d' % (
+            idx * 2654435761 % 0xfffffff,
+            timestamp,
+            rand.choice(OFFSETS),
+            rand.randrange(author_count),
+        ) for idx, timestamp in enumerate(times)
+    ]
+
+class LogSource:
+    """A commit source that parses log lines already in memory instead of running git."""
+
+    def __init__(self, lines):
+        self.lines = lines
+
+    def fold(self, plan: BucketPlan) -> None:
+        store = gitcommit.load_commit_store(self.lines)
+        store.reverse()
+        store.sort()
+        plan.add_sorted_times(store.times, store.author_index())
+        plan.finish()
+
+def parse_table_args(store):
+    return args.parse_args(TABLE_ARGS, CommitSource(commits=store))
+
+def stage_parse(lines):
+    store = gitcommit.load_commit_store(lines)
+    store.reverse()
+    store.sort()
+    return store
+
+def stage_bucket(table_configs, store):
+    plan, counters = gitcal.create_plan(table_configs)
+    plan.add_sorted_times(store.times, store.author_index())
+    plan.finish()
+    return counters
+
+def stage_collapse(tables):
+    gitcal.do_collapses(tables)
+    return tables
+
+def stage_render(argspace, tables):
+    return Table.draw_tables(tables, spacing=argspace.spacing)
+
+def stage_end_to_end(argspace, table_configs, lines):
+    tables = gitcal.create_tables(argspace, table_configs, LogSource(lines))
+    return Table.draw_tables(tables, spacing=argspace.spacing)
+
+def measure(fnc, *fnc_args, memory=True):
+    start = time.perf_counter()
+    fnc(*fnc_args)
+    elapsed = time.perf_counter() - start
+
+    peak = None
+    if memory:
+        tracemalloc.start()
+        fnc(*fnc_args)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return elapsed, peak
+
+def run(distribution, count, memory=True):
+    lines = generate_log(distribution, count)
+
+    # the bucket stage only counts, so the commits are parsed and split by author before it
+    store = stage_parse(lines)
+    store.author_index()
+    argspace, table_configs = parse_table_args(store)
+
+    results = {}
+    results['parse'] = measure(stage_parse, lines, memory=memory)
+    results['bucket'] = measure(stage_bucket, table_configs, store, memory=memory)
+
+    # the collapse stage is measured on its own,
+    # so the tables are built from the counters without collapsing them
+    tables = gitcal.create_tables_from_counters(table_configs, stage_bucket(table_configs, store))
+
+    # collapsing changes the tables, so every run gets its own copy
+    tables_copies = [ copy.deepcopy(tables) for _ in range(2) ]
+    results['collapse'] = measure(lambda: stage_collapse(tables_copies.pop()), memory=memory)
+
+    collapsed = stage_collapse(copy.deepcopy(tables))
+    results['render'] = measure(stage_render, argspace, collapsed, memory=memory)
+    results['end_to_end'] = measure(stage_end_to_end, argspace, table_configs, lines, memory=memory)
+
+    return [
+        {
+            'distribution': distribution,
+            'commits': count,
+            'stage': stage,
+            'seconds': round(results[stage][0], 6),
+            'peak_bytes': results[stage][1],
+        } for stage in STAGES
+    ]
+
+def compare(old_results, new_results):
+    old_map = {}
+    for entry in old_results['results']:
+        old_map[(entry['distribution'], entry['commits'], entry['stage'])] = entry
+
+    print('%14s  %9s  %10s  %10s  %10s  %7s  %7s' % (
+        'distribution', 'commits', 'stage', 'old (s)', 'new (s)', 'time', 'memory'
+    ))
+    for entry in new_results['results']:
+        old = old_map.get((entry['distribution'], entry['commits'], entry['stage']))
+        if old is None:
+            continue
+
+        memory = '-'
+        if old['peak_bytes'] and entry['peak_bytes']:
+            memory = '%6.2fx' % (entry['peak_bytes'] / old['peak_bytes'])
+        print('%14s  %9d  %10s  %10.4f  %10.4f  %6.2fx  %7s' % (
+            entry['distribution'],
+            entry['commits'],
+            entry['stage'],
+            old['seconds'],
+            entry['seconds'],
+            entry['seconds'] / old['seconds'] if old['seconds'] else 0,
+            memory,
+        ))
+
+def main():
+    parser = argparse.ArgumentParser(description='measure gitcal stages on synthetic histories')
+    parser.add_argument('--sizes', nargs='+', type=int, default=[10000, 100000, 1000000],
+        help='commit counts to measure, up to 10000000'
+    )
+    parser.add_argument('--distributions', nargs='+',
+        choices=list(DISTRIBUTIONS), default=list(DISTRIBUTIONS)
+    )
+    parser.add_argument('--output', metavar='FILE',
+        help='write the results to FILE instead of stdout'
+    )
+    parser.add_argument('--no-memory', dest='memory', action='store_false', default=True,
+        help='skip the second run of each stage that measures peak memory'
+    )
+    parser.add_argument('--compare', metavar='FILE',
+        help='compare the results with an earlier results file'
+    )
+    argspace = parser.parse_args()
+
+    results = {
+        'gitcal': __version__,
+        'python': platform.python_version(),
+        'results': [],
+    }
+    for distribution in argspace.distributions:
+        for count in argspace.sizes:
+            print('%s %d' % (distribution, count), file=sys.stderr)
+            results['results'].extend(run(distribution, count, memory=argspace.memory))
+
+    output = json.dumps(results, indent=2, sort_keys=True)
+    if argspace.output is not None:
+        with open(argspace.output, 'w', encoding='utf-8') as file:
+            file.write(output + '\n')
+    else:
+        print(output)
+
+    if argspace.compare is not None:
+        with open(argspace.compare, 'r', encoding='utf-8') as file:
+            compare(json.load(file), results)
+
+if __name__ == '__main__':
+    main()
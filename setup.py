@@ -23,6 +23,9 @@ setuptools.setup(
     package_dir={'': 'src'},
     packages=setuptools.find_packages(where='src'),
     python_requires='>=3.6',
+    extras_require={
+        'numpy': ['numpy'],
+    },
     entry_points={
         'console_scripts': ['gitcal=gitcal.__main__:main']
     }
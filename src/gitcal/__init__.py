@@ -1 +1,4 @@
 __version__ = '0.0.3'
+
+from .gitcal import build_tables, render_tables
+from .tableconfig import TableConfig
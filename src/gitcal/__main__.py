@@ -1,19 +1,73 @@
+import os
 import sys
+import typing
 
-from . import __version__, args, gitcal
+from . import __version__, args, gitcal, server, watch
+from .commitsource import CommitSource
 
 def main():
-    print(draw_tables_from_args(sys.argv[1:]))
+    if len(sys.argv) > 1 and sys.argv[1] == 'serve':
+        server.main(sys.argv[2:])
+        return
+
+    argv = sys.argv[1:]
+    commit_source = CommitSource()
+    argspace = parse_source_args(argv, commit_source)
+    if argspace.watch is not None:
+        try:
+            watch.watch(argv, commit_source, sys.stdout, argspace.watch)
+        except KeyboardInterrupt:
+            pass
+        return
+
+    argspace, table_configs = parse_tables(argv, commit_source)
+
+    profiler = commit_source.profiler
+    try:
+        lines = gitcal.draw_tables_iter(argspace, table_configs, commit_source, profiler)
+        write_lines(sys.stdout, lines)
+        sys.stdout.flush()
+    except BrokenPipeError:
+        # stdout is flushed again at exit, which would raise another BrokenPipeError
+        devnull = os.open(os.devnull, os.O_WRONLY)
+        os.dup2(devnull, sys.stdout.fileno())
+        sys.exit(1)
+    finally:
+        if profiler is not None:
+            profiler.stop()
+            profiler.write_json(sys.stderr)
+
+def write_lines(file: typing.TextIO, lines: typing.Iterable[str]) -> None:
+    for line in lines:
+        file.write(line)
+        file.write('\n')
+    file.write('\n')
 
 def draw_tables_from_args(argv):
-    argspace, table_configs = args.parse_args(argv)
+    argspace, table_configs, commit_source = parse_table_args(argv)
+    return gitcal.draw_tables(argspace, table_configs, commit_source, commit_source.profiler)
+
+def draw_tables_iter_from_args(argv):
+    argspace, table_configs, commit_source = parse_table_args(argv)
+    return gitcal.draw_tables_iter(argspace, table_configs, commit_source, commit_source.profiler)
+
+def parse_table_args(argv):
+    commit_source = CommitSource()
+    parse_source_args(argv, commit_source)
+    argspace, table_configs = parse_tables(argv, commit_source)
+    return argspace, table_configs, commit_source
 
+def parse_source_args(argv, commit_source: CommitSource):
+    argspace = args.parse_source_args(argv, commit_source)
     if argspace.version:
         print(__version__)
         sys.exit(0)
+    return argspace
 
-    args.append_table_config(argspace, table_configs)
-    return gitcal.draw_tables(argspace, table_configs)
+def parse_tables(argv, commit_source: CommitSource):
+    argspace, table_configs = args.parse_table_configs(argv, commit_source)
+    args.append_table_config(argspace, table_configs, commit_source)
+    return argspace, table_configs
 
 if __name__ == '__main__': #pragma: no cover
     main()
@@ -1,12 +1,14 @@
 import argparse
 from argparse import Action, Namespace
 from datetime import datetime, timedelta
+import os
 import re
 import sys
 import typing
 
-from . import gitcommit
-from .tableconfig import TableConfig
+from .commitsource import CommitSource
+from .profiling import Profiler
+from .tableconfig import TableConfig, guess_col_count # pylint: disable=unused-import
 
 class ColAction(Action):
     def __call__(self, parser, namespace, values, option_string=None):
@@ -52,15 +54,11 @@ def table_config_from_namespace(namespace: Namespace) -> TableConfig:
     namespace.tbl_name = None
 
     delta = getattr(namespace, 'delta')
-    if delta is None:
-        delta = timedelta(days=1)
 
     col = namespace.col
-    if col is None or col.lower() == 'guess':
-        col = guess_col_count(delta)
-        if col is None:
-            col = 10
-    else:
+    if col is not None and col.lower() == 'guess':
+        col = None
+    elif col is not None:
         col = int(col)
 
     def convert_date(val: str) -> typing.Optional[datetime]:
@@ -103,50 +101,23 @@ def table_config_from_namespace(namespace: Namespace) -> TableConfig:
         num=namespace.num,
     )
 
-def guess_col_count(delta: timedelta, min_col: int = 4, max_col: int = 12):
-    timeframes = [
-        60, # 1 minute
-        3600, # 1 hour
-        6 * 3600, # 6 hours
-        86400, # 1 day
-        7 * 86400, # 1 week
-        14 * 86400, # 2 weeks
-    ]
-
-    seconds = delta.days * 86400 + delta.seconds
-    idx = 0
-
-    for i in range(len(timeframes)):
-        idx = i
-        if seconds < timeframes[idx]:
-            break
-
-    count = timeframes[idx] // seconds
-    checked = set()
-
-    while count < min_col or count > max_col:
-        if count < min_col:
-            idx += 1
-        else:
-            idx -= 1
-
-        if idx == -1 or idx == len(timeframes) or idx in checked:
-            return None
-
-        count = timeframes[idx] // seconds
-        checked.add(idx)
-    return count
-
-def append_table_config(namespace: Namespace, table_configs: typing.List[TableConfig]):
+def append_table_config(
+    namespace: Namespace,
+    table_configs: typing.List[TableConfig],
+    commit_source: CommitSource
+):
     if namespace.all_users:
-        append_all_users_table(namespace, table_configs)
+        append_all_users_table(namespace, table_configs, commit_source)
         namespace.all_users = False
     else:
         table_configs.append(table_config_from_namespace(namespace))
 
-def append_all_users_table(namespace: Namespace, table_configs: typing.List[TableConfig]):
-    commits = gitcommit.get_commit_data()
-    users = gitcommit.get_users_from_commits(commits)
+def append_all_users_table(
+    namespace: Namespace,
+    table_configs: typing.List[TableConfig],
+    commit_source: CommitSource
+):
+    users = set(commit_source.users)
     do_label = namespace.label
 
     for user in namespace.exclude:
@@ -157,7 +128,9 @@ def append_all_users_table(namespace: Namespace, table_configs: typing.List[Tabl
 
     last_date = namespace.end
     if last_date is None:
-        last_date = commits[0].datetime.strftime('%Y-%m-%d %H:%M:%S')
+        date = commit_source.last_date()
+        if date is not None:
+            last_date = date.strftime('%Y-%m-%d %H:%M:%S')
 
     user_dict = {}
     for user in users:
@@ -211,12 +184,111 @@ def append_all_users_table(namespace: Namespace, table_configs: typing.List[Tabl
 
     namespace.merge = []
 
-def parse_args(argv) -> typing.Tuple[Namespace, typing.List[TableConfig]]:
+def read_repo_list(fname: str) -> typing.List[str]:
+    base = os.path.dirname(fname)
+    paths = []
+    with open(fname, 'r', encoding='utf-8') as file:
+        for line in file:
+            line = line.strip()
+            if len(line) != 0 and not line.startswith('#'):
+                paths.append(os.path.join(base, line))
+    return paths
+
+def parse_args(
+    argv,
+    commit_source: CommitSource
+) -> typing.Tuple[Namespace, typing.List[TableConfig]]:
+    """Parses the arguments into table configs.
+
+    The options choosing where commits are read from are applied to the commit source on a first
+    pass over the arguments, so tables made by -T read from every repository given, before or
+    after it.
+    """
+    parse_source_args(argv, commit_source)
+    return parse_table_configs(argv, commit_source)
+
+def parse_source_args(argv, commit_source: CommitSource) -> Namespace:
+    """Applies the options choosing where commits are read from to the commit source."""
+    return create_parser(commit_source).parse_args(argv)
+
+def parse_table_configs(
+    argv,
+    commit_source: CommitSource
+) -> typing.Tuple[Namespace, typing.List[TableConfig]]:
+    """Parses the arguments into table configs, leaving the commit source as it is."""
     table_configs: typing.List[TableConfig] = []
+    argspace = create_parser(commit_source, table_configs).parse_args(argv)
+    return argspace, table_configs
+
+def create_parser(
+    commit_source: CommitSource,
+    table_configs: typing.Optional[typing.List[TableConfig]] = None
+) -> argparse.ArgumentParser:
+    """Returns the argument parser, which appends each table to table_configs.
+
+    If table_configs is None, no tables are made, and the options choosing where commits are read
+    from are applied to the commit source instead.
+    """
+    apply_sources = table_configs is None
 
     class TableAction(Action):
         def __call__(self, parser, namespace, values, option_string=None):
-            append_table_config(namespace, table_configs)
+            if table_configs is not None:
+                append_table_config(namespace, table_configs, commit_source)
+
+    class CacheAction(Action):
+        def __call__(self, parser, namespace, values, option_string=None):
+            setattr(namespace, 'cache', True)
+            if apply_sources:
+                commit_source.use_cache = True
+
+    class CommitterDateAction(Action):
+        def __call__(self, parser, namespace, values, option_string=None):
+            setattr(namespace, self.dest, True)
+            if apply_sources:
+                commit_source.committer_date = True
+
+    class ProfileAction(Action):
+        def __call__(self, parser, namespace, values, option_string=None):
+            setattr(namespace, self.dest, values)
+            if apply_sources:
+                commit_source.profiler = Profiler(trace_memory=values != 'time')
+
+    class WatchAction(Action):
+        def __call__(self, parser, namespace, values, option_string=None):
+            if values <= 0:
+                parser.error('watch interval must be greater than 0')
+            setattr(namespace, self.dest, values)
+
+    class ShardsAction(Action):
+        def __call__(self, parser, namespace, values, option_string=None):
+            if values < 1:
+                parser.error('shard count must be at least 1')
+            setattr(namespace, self.dest, values)
+            if apply_sources:
+                commit_source.shards = values
+
+    class RepoAction(Action):
+        def __call__(self, parser, namespace, values, option_string=None):
+            if not os.path.isdir(values):
+                parser.error('repository path does not exist: %s' % values)
+            getattr(namespace, self.dest).append(values)
+            if apply_sources:
+                commit_source.add_repo(values)
+
+    class ReposFromAction(Action):
+        def __call__(self, parser, namespace, values, option_string=None):
+            try:
+                paths = read_repo_list(values)
+            except OSError as exc:
+                parser.error('could not read repository list: %s' % exc)
+
+            for path in paths:
+                if not os.path.isdir(path):
+                    parser.error('repository path does not exist: %s' % path)
+                namespace.repo.append(path)
+                if apply_sources:
+                    commit_source.add_repo(path)
 
     parser = argparse.ArgumentParser(
         description='Show git commits in a visual calendar-like format'
@@ -226,6 +298,41 @@ def parse_args(argv) -> typing.Tuple[Namespace, typing.List[TableConfig]]:
         action='store_true', default=False,
         help='show the version number and exit'
     )
+    parser.add_argument('--cache',
+        action=CacheAction, nargs=0, default=False,
+        help='cache the commit history in the .git directory and only read new commits from git'
+        + ' on later runs'
+    )
+    parser.add_argument('--committer-date',
+        action=CommitterDateAction, nargs=0, default=False,
+        help='use commit dates in local time instead of author dates in the author\'s time'
+        + ', read from the commit-graph file if the repository has one'
+    )
+    parser.add_argument('--profile',
+        action=ProfileAction, nargs='?', choices=['full', 'time'], const='full', default=None,
+        help='write the time and peak memory of each phase, and counts of commits, buckets, rows'
+        + ' and output bytes, as JSON to stderr. tracing memory slows down python, use "time" to'
+        + ' only measure time'
+    )
+    parser.add_argument('--watch',
+        action=WatchAction, nargs='?', type=float, const=2.0, default=None, metavar='SECONDS',
+        help='keep running and redraw the tables when new commits are made, checking every SECONDS'
+        + ' seconds (default 2)'
+    )
+    parser.add_argument('--shards',
+        action=ShardsAction, type=int, metavar='N', default=1,
+        help='read the history with up to N git processes in parallel, if the repository has a'
+        + ' commit-graph'
+    )
+    parser.add_argument('--repo',
+        action=RepoAction, metavar='PATH', default=[],
+        help='read commits from the repository at PATH instead of the current directory'
+        + ', can be used multiple times to combine repositories'
+    )
+    parser.add_argument('--repos-from',
+        action=ReposFromAction, metavar='FILE', dest='repo',
+        help='read repository paths from FILE, one per line, relative to the directory of FILE'
+    )
 
     group = parser.add_argument_group('table options')
     group.add_argument('-n', '--tbl-name',
@@ -362,5 +469,4 @@ def parse_args(argv) -> typing.Tuple[Namespace, typing.List[TableConfig]]:
         help='do not print the commit counts in the cells (default)'
     )
 
-    argspace = parser.parse_args(argv)
-    return argspace, table_configs
+    return parser
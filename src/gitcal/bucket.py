@@ -0,0 +1,374 @@
+from array import array
+import bisect
+from datetime import datetime, timedelta
+import math
+import typing
+
+from .sparsegrid import SparseGrid
+
+try:
+    import numpy
+except ImportError: #pragma: no cover
+    numpy = None
+
+SECONDS_PER_DAY = 86400
+EPOCH = datetime(1970, 1, 1)
+
+# numpy is only used for inputs at least this large,
+# below it the conversion costs more than it saves
+NUMPY_MIN_SIZE = 1024
+
+# bucket sizes of the rollup levels, each one dividing the next
+ROLLUP_LEVELS = (60, 3600, SECONDS_PER_DAY)
+
+def to_timestamp(dtime: datetime) -> int:
+    """Converts a naive datetime to seconds since the epoch without applying any timezone."""
+    delta = dtime - EPOCH
+    return delta.days * SECONDS_PER_DAY + delta.seconds
+
+def from_timestamp(timestamp: int) -> datetime:
+    return EPOCH + timedelta(seconds=timestamp)
+
+def delta_seconds(delta: timedelta) -> int:
+    return delta.days * SECONDS_PER_DAY + delta.seconds
+
+class Rollup:
+    """Commit counts summed into minute, hour and day buckets, for all commits and for each author.
+
+    Levels are built on first use, each from the finer level below it, and buckets include their
+    end time like the buckets of the counters. The sorted commit times are kept for the buckets
+    that are cut by a date window.
+    """
+
+    def __init__(self, times: array, author_times: typing.Dict[str, array], **kwargs):
+        self.times: array = times
+        self.author_times: typing.Dict[str, array] = author_times
+
+        # counts keyed by (level, author name or None for all commits)
+        self.levels: typing.Dict[tuple, typing.Dict[int, int]] = kwargs.get('levels', {})
+
+    def get_times(self, author_name: typing.Optional[str] = None) -> array:
+        if author_name is None:
+            return self.times
+        return self.author_times.get(author_name, array('q'))
+
+    def level_for(self, resolution: int) -> typing.Optional[int]:
+        """Returns the coarsest level that divides the resolution, if any."""
+        levels = [ level for level in ROLLUP_LEVELS if resolution % level == 0 ]
+        return levels[-1] if len(levels) != 0 else None
+
+    def level_counts(
+        self,
+        level: int,
+        author_name: typing.Optional[str] = None
+    ) -> typing.Dict[int, int]:
+        """Returns the commit counts keyed by (timestamp - 1) // level."""
+        counts = self.levels.get((level, author_name))
+        if counts is not None:
+            return counts
+
+        finer = [ size for size in ROLLUP_LEVELS if size < level and level % size == 0 ]
+        if len(finer) != 0:
+            scale = level // finer[-1]
+            counts = {}
+            for key, count in self.level_counts(finer[-1], author_name).items():
+                key //= scale
+                counts[key] = counts.get(key, 0) + count
+        else:
+            counts = count_keys(self.get_times(author_name), level)
+
+        self.levels[(level, author_name)] = counts
+        return counts
+
+def count_keys(times: array, size: int) -> typing.Dict[int, int]:
+    """Returns the number of timestamps in each bucket of size seconds.
+
+    Buckets are keyed by (timestamp - 1) // size.
+    """
+    if numpy is not None and len(times) >= NUMPY_MIN_SIZE:
+        keys = (numpy.frombuffer(times, dtype=numpy.int64) - 1) // size
+        keys, counts = numpy.unique(keys, return_counts=True)
+        return dict(zip(keys.tolist(), counts.tolist()))
+
+    counts: typing.Dict[int, int] = {}
+    for timestamp in times:
+        key = (timestamp - 1) // size
+        counts[key] = counts.get(key, 0) + 1
+    return counts
+
+class BucketCounter:
+    # counts are kept at a resolution dividing both the delta and a day, since tables start at
+    # midnight of the earliest commit, which is not known until every commit has been seen
+
+    def __init__(self, delta: timedelta, **kwargs):
+        start: typing.Optional[datetime] = kwargs.get('start')
+        end: typing.Optional[datetime] = kwargs.get('end')
+        filter_names: typing.Optional[typing.List[str]] = kwargs.get('filter_names')
+
+        self.delta: timedelta = delta
+        self.delta_seconds: int = delta_seconds(delta)
+        self.resolution: int = math.gcd(self.delta_seconds, SECONDS_PER_DAY)
+
+        self.start_time: typing.Optional[int] = to_timestamp(start) if start is not None else None
+        self.end_time: typing.Optional[int] = to_timestamp(end) if end is not None else None
+        self.filter_names: typing.Optional[typing.Set[str]] = (
+            set(filter_names) if filter_names is not None and len(filter_names) != 0 else None
+        )
+
+        self.counts: typing.Dict[int, int] = {}
+        self.first_time: typing.Optional[int] = None
+        self.first_time_after_start: typing.Optional[int] = None
+
+    def add(self, timestamp: int, author_name: str) -> None:
+        self.track_time(timestamp)
+        if self.filter_names is not None and author_name not in self.filter_names:
+            return
+        self.count(timestamp)
+
+    def track_time(self, timestamp: int) -> None:
+        """Records a commit time of any author, which determines where the table starts."""
+        if self.first_time is None or timestamp < self.first_time:
+            self.first_time = timestamp
+
+        if self.start_time is not None and timestamp >= self.start_time:
+            if self.first_time_after_start is None or timestamp < self.first_time_after_start:
+                self.first_time_after_start = timestamp
+
+    def count(self, timestamp: int) -> None:
+        """Counts a commit that already matches the author filter, if it is in the date window."""
+        if self.start_time is not None and timestamp < self.start_time:
+            return
+        if self.end_time is not None and timestamp > self.end_time:
+            return
+
+        # buckets include their end time,
+        # so a commit exactly on a boundary counts towards the earlier one
+        key = (timestamp - 1) // self.resolution
+        self.counts[key] = self.counts.get(key, 0) + 1
+
+    def count_times(self, times: array) -> None:
+        """Counts sorted commit timestamps that already match the author filter."""
+        low = 0 if self.start_time is None else bisect.bisect_left(times, self.start_time)
+        high = len(times) if self.end_time is None else bisect.bisect_right(times, self.end_time)
+        if low >= high:
+            return
+
+        if numpy is not None and high - low >= NUMPY_MIN_SIZE:
+            self._count_numpy(numpy.frombuffer(times, dtype=numpy.int64)[low:high])
+            return
+
+        resolution = self.resolution
+        counts = self.counts
+        for idx in range(low, high):
+            key = (times[idx] - 1) // resolution
+            counts[key] = counts.get(key, 0) + 1
+
+    def count_rollup(self, rollup: Rollup, author_name: typing.Optional[str] = None) -> None:
+        """Counts the commits of an author, or of everyone, summing the buckets of a rollup level.
+
+        Level buckets that are only partly inside the date window are counted from the commit times.
+        """
+        times = rollup.get_times(author_name)
+        level = rollup.level_for(self.resolution)
+        if level is None:
+            self.count_times(times)
+            return
+        if len(times) == 0:
+            return
+
+        # keys of the level buckets entirely inside the date window
+        low = None if self.start_time is None else -(-(self.start_time - 1) // level)
+        high = None if self.end_time is None else self.end_time // level - 1
+
+        scale = self.resolution // level
+        counts = self.counts
+        for key, count in rollup.level_counts(level, author_name).items():
+            if (low is not None and key < low) or (high is not None and key > high):
+                continue
+            key //= scale
+            counts[key] = counts.get(key, 0) + count
+
+        edges = set()
+        if low is not None:
+            edges.add(low - 1)
+        if high is not None:
+            edges.add(high + 1)
+        for key in edges:
+            first = key * level + 1
+            last = (key + 1) * level
+            if self.start_time is not None:
+                first = max(first, self.start_time)
+            if self.end_time is not None:
+                last = min(last, self.end_time)
+            if first > last:
+                continue
+
+            count = bisect.bisect_right(times, last) - bisect.bisect_left(times, first)
+            if count != 0:
+                key //= scale
+                counts[key] = counts.get(key, 0) + count
+
+    def _count_numpy(self, time_arr) -> None:
+        if time_arr.size == 0:
+            return
+
+        keys = (time_arr - 1) // self.resolution
+        low = int(keys.min())
+        key_counts = numpy.bincount(keys - low)
+        nonzero = numpy.flatnonzero(key_counts)
+
+        for key, count in zip((nonzero + low).tolist(), key_counts[nonzero].tolist()):
+            self.counts[key] = self.counts.get(key, 0) + count
+
+    def bucket_counts(self, origin: int) -> typing.Dict[int, int]:
+        """Returns the commit counts keyed by bucket index, where bucket 0 starts at origin."""
+        scale = self.delta_seconds // self.resolution
+        base = origin // self.resolution
+
+        if numpy is not None and len(self.counts) >= NUMPY_MIN_SIZE:
+            keys = numpy.fromiter(self.counts.keys(), dtype=numpy.int64, count=len(self.counts))
+            counts = numpy.fromiter(self.counts.values(), dtype=numpy.int64, count=len(self.counts))
+            indices, inverse = numpy.unique(
+                numpy.maximum((keys - base) // scale, 0),
+                return_inverse=True
+            )
+            sums = numpy.bincount(inverse.ravel(), weights=counts).astype(numpy.int64)
+            return dict(zip(indices.tolist(), sums.tolist()))
+
+        buckets: typing.Dict[int, int] = {}
+        for key, count in self.counts.items():
+            idx = max((key - base) // scale, 0)
+            buckets[idx] = buckets.get(idx, 0) + count
+        return buckets
+
+    def bucket_index(self, origin: int, timestamp: int) -> int:
+        return max((timestamp - 1 - origin) // self.delta_seconds, 0)
+
+    def last_bucket_index(self, origin: int) -> typing.Optional[int]:
+        if len(self.counts) == 0:
+            return None
+        buckets_per_delta = self.delta_seconds // self.resolution
+        return max((max(self.counts) - origin // self.resolution) // buckets_per_delta, 0)
+
+    def grid(self, origin: int, row_count: int, col_count: int) -> SparseGrid:
+        """Returns the bucket counts as rows of col_count buckets, bucket 0 starting at origin."""
+        return SparseGrid.from_buckets(self.bucket_counts(origin), row_count, col_count)
+
+class BucketPlan:
+    """Counts a commit stream once for many tables.
+
+    Tables with the same delta, date window and author filter share one counter, and each commit
+    is only counted by the counters whose author filter it matches.
+    """
+
+    def __init__(self):
+        self.counters: typing.List[BucketCounter] = []
+        self.first_time: typing.Optional[int] = None
+        self.commit_count: int = 0
+
+        self._counter_map: typing.Dict[tuple, BucketCounter] = {}
+        self._unfiltered: typing.List[BucketCounter] = []
+        self._by_author: typing.Dict[str, typing.List[BucketCounter]] = {}
+        self._first_times_after: typing.Dict[int, typing.Optional[int]] = {}
+
+    def counter(self, delta: timedelta, **kwargs) -> BucketCounter:
+        counter = BucketCounter(delta, **kwargs)
+        key = (
+            counter.delta_seconds,
+            counter.start_time,
+            counter.end_time,
+            frozenset(counter.filter_names) if counter.filter_names is not None else None,
+        )
+
+        existing = self._counter_map.get(key)
+        if existing is not None:
+            return existing
+
+        self._counter_map[key] = counter
+        self.counters.append(counter)
+
+        if counter.filter_names is None:
+            self._unfiltered.append(counter)
+        else:
+            for name in counter.filter_names:
+                self._by_author.setdefault(name, []).append(counter)
+
+        if counter.start_time is not None:
+            self._first_times_after.setdefault(counter.start_time, None)
+        return counter
+
+    def needs_authors(self) -> bool:
+        """Returns whether any counter filters commits by author name."""
+        return len(self._by_author) != 0
+
+    def add(self, timestamp: int, author_name: str) -> None:
+        self.commit_count += 1
+        if self.first_time is None or timestamp < self.first_time:
+            self.first_time = timestamp
+
+        for start_time, first_time in self._first_times_after.items():
+            if timestamp >= start_time and (first_time is None or timestamp < first_time):
+                self._first_times_after[start_time] = timestamp
+
+        for counter in self._unfiltered:
+            counter.count(timestamp)
+
+        counters = self._by_author.get(author_name)
+        if counters is not None:
+            for counter in counters:
+                counter.count(timestamp)
+
+    def add_sorted_times(self, times: array, author_times: typing.Dict[str, array]) -> None:
+        """Counts commits given as sorted timestamps, both for all commits and for each author.
+
+        Counters only read the part of the timestamps inside their date window, and filtered
+        counters only read the timestamps of their own authors.
+        """
+        if len(times) == 0:
+            return
+        self._track_sorted_times(times)
+
+        for counter in self._unfiltered:
+            counter.count_times(times)
+
+        for name, counters in self._by_author.items():
+            author_time = author_times.get(name)
+            if author_time is not None:
+                for counter in counters:
+                    counter.count_times(author_time)
+
+    def add_rollup(self, rollup: Rollup) -> None:
+        """Counts commits from a rollup, summing its buckets instead of reading every commit time
+        wherever the delta of a counter is a multiple of a rollup level.
+        """
+        if len(rollup.times) == 0:
+            return
+        self._track_sorted_times(rollup.times)
+
+        for counter in self._unfiltered:
+            counter.count_rollup(rollup)
+
+        for name, counters in self._by_author.items():
+            if name in rollup.author_times:
+                for counter in counters:
+                    counter.count_rollup(rollup, name)
+
+    def _track_sorted_times(self, times: array) -> None:
+        self.commit_count += len(times)
+        if self.first_time is None or times[0] < self.first_time:
+            self.first_time = times[0]
+
+        for start_time, first_time in self._first_times_after.items():
+            idx = bisect.bisect_left(times, start_time)
+            if idx != len(times) and (first_time is None or times[idx] < first_time):
+                self._first_times_after[start_time] = times[idx]
+
+    def finish(self) -> None:
+        """Passes the commit times seen by the plan on to its counters."""
+        for counter in self.counters:
+            if self.first_time is not None:
+                counter.track_time(self.first_time)
+            if counter.start_time is not None:
+                first_time = self._first_times_after[counter.start_time]
+                if first_time is not None:
+                    counter.track_time(first_time)
@@ -0,0 +1,20 @@
+from datetime import datetime
+
+from .bucket import from_timestamp
+
+class Commit:
+    def __init__(self, shorthash: str, timestamp: int, name: str):
+        self.shorthash: str = shorthash
+        self.timestamp: int = timestamp
+        self.author_name: str = name
+
+    @property
+    def datetime(self) -> datetime:
+        return from_timestamp(self.timestamp)
+
+    def json(self) -> dict:
+        return {
+            'shorthash': self.shorthash,
+            'datetime': str(self.datetime),
+            'author_name': self.author_name
+        }
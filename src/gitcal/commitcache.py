@@ -0,0 +1,214 @@
+from array import array
+import io
+import json
+import os
+import subprocess
+import sys
+import typing
+
+from . import gitcommit
+from .bucket import SECONDS_PER_DAY, Rollup
+from .commit import Commit
+
+CACHE_DIRNAME = 'gitcal'
+CACHE_VERSION = 1
+ROLLUP_VERSION = 1
+
+# the minute level is about as large as the commit times it is built from,
+# so only coarser levels are saved
+SAVED_ROLLUP_LEVELS = (3600, SECONDS_PER_DAY)
+
+class CommitCache:
+    def __init__(self, path: str):
+        self.path: str = path
+        self.tips_path: str = os.path.join(path, 'tips')
+        self.log_path: str = os.path.join(path, 'log')
+        self.rollup_path: str = os.path.join(path, 'rollup')
+
+    def header(self) -> str:
+        return 'gitcal-cache %d %s %s' % (
+            CACHE_VERSION,
+            gitcommit.LOG_FORMAT,
+            gitcommit.LOG_DATE_FORMAT
+        )
+
+    def load(self) -> typing.Optional[typing.Tuple[typing.List[str], bytes]]:
+        try:
+            with open(self.tips_path, 'r', encoding='utf-8') as file:
+                lines = file.read().splitlines()
+            with open(self.log_path, 'rb') as file:
+                log = file.read()
+        except OSError:
+            return None
+
+        if len(lines) < 2 or lines[0] != self.header():
+            return None
+        return lines[1:], log
+
+    def save(self, tips: typing.List[str], log: bytes) -> None:
+        os.makedirs(self.path, exist_ok=True)
+
+        # the log is written before the tips so an interrupted save
+        # never pairs new tips with an old log
+        write_atomic(self.log_path, log)
+        write_atomic(self.tips_path, ('\n'.join([self.header(), *tips]) + '\n').encode('utf-8'))
+
+    def load_rollup(self, tips: typing.List[str]) -> typing.Optional[Rollup]:
+        """Returns the saved rollup if it was made from the history at the given tips."""
+        try:
+            with open(self.rollup_path, 'rb') as file:
+                data = file.read()
+        except OSError:
+            return None
+
+        header_end = data.find(b'\n')
+        try:
+            header = json.loads(data[:header_end].decode('utf-8'))
+        except ValueError:
+            return None
+        if not isinstance(header, dict) \
+            or header.get('version') != ROLLUP_VERSION \
+            or header.get('byteorder') != sys.byteorder \
+            or header.get('tips') != tips:
+            return None
+
+        offset = header_end + 1
+        def read_array(length: int) -> array:
+            nonlocal offset
+            arr = array('q')
+            arr.frombytes(data[offset:offset + length * arr.itemsize])
+            if len(arr) != length:
+                raise ValueError('rollup is truncated')
+            offset += length * arr.itemsize
+            return arr
+
+        times: typing.Optional[array] = None
+        author_times: typing.Dict[str, array] = {}
+        levels: typing.Dict[tuple, typing.Dict[int, int]] = {}
+        try:
+            for author_name, level, length in header['sections']:
+                if level == 0:
+                    if author_name is None:
+                        times = read_array(length)
+                    else:
+                        author_times[author_name] = read_array(length)
+                else:
+                    keys = read_array(length)
+                    levels[(level, author_name)] = dict(zip(keys, read_array(length)))
+        except (KeyError, TypeError, ValueError):
+            return None
+
+        if times is None or offset != len(data):
+            return None
+        return Rollup(times, author_times, levels=levels)
+
+    def save_rollup(self, tips: typing.List[str], rollup: Rollup) -> None:
+        sections = []
+        arrays = []
+        for author_name in [None, *sorted(rollup.author_times)]:
+            times = rollup.get_times(author_name)
+            sections.append([author_name, 0, len(times)])
+            arrays.append(times)
+
+            for level in SAVED_ROLLUP_LEVELS:
+                counts = rollup.level_counts(level, author_name)
+                sections.append([author_name, level, len(counts)])
+                arrays.append(array('q', counts.keys()))
+                arrays.append(array('q', counts.values()))
+
+        header = json.dumps({
+            'version': ROLLUP_VERSION,
+            'byteorder': sys.byteorder,
+            'tips': tips,
+            'sections': sections,
+        })
+        os.makedirs(self.path, exist_ok=True)
+        data = b''.join([header.encode('utf-8') + b'\n', *map(lambda x: x.tobytes(), arrays)])
+        write_atomic(self.rollup_path, data)
+
+def write_atomic(path: str, data: bytes) -> None:
+    tmp_path = '%s.%d.tmp' % (path, os.getpid())
+    with open(tmp_path, 'wb') as file:
+        file.write(data)
+    os.replace(tmp_path, path)
+
+def get_cache_dir(cwd: typing.Optional[str] = None) -> str:
+    output = subprocess.check_output(['git', 'rev-parse', '--git-dir'], cwd=cwd)
+    git_dir = output.decode('utf-8').strip()
+    if cwd is not None:
+        git_dir = os.path.join(cwd, git_dir)
+    return os.path.join(git_dir, CACHE_DIRNAME)
+
+def get_ref_tips(cwd: typing.Optional[str] = None) -> typing.List[str]:
+    output = subprocess.check_output(['git', 'rev-parse', 'HEAD'], cwd=cwd)
+    return output.decode('utf-8').split()
+
+def is_history_rewritten(
+    old_tips: typing.List[str],
+    new_tips: typing.List[str],
+    cwd: typing.Optional[str] = None
+) -> bool:
+    # any commit reachable from the old tips but not the new ones means cached commits are gone
+    try:
+        output = subprocess.check_output([
+            'git', 'rev-list', '--count',
+            *old_tips,
+            '--not',
+            *new_tips
+        ], stderr=subprocess.DEVNULL, cwd=cwd)
+    except subprocess.CalledProcessError:
+        return True
+    return int(output.decode('utf-8').strip()) != 0
+
+def update_cache(
+    cache: typing.Optional[CommitCache] = None,
+    cwd: typing.Optional[str] = None,
+    shards: int = 1,
+    tips: typing.Optional[typing.List[str]] = None
+) -> bytes:
+    if cache is None:
+        cache = CommitCache(get_cache_dir(cwd))
+
+    if tips is None:
+        tips = get_ref_tips(cwd)
+    cached = cache.load()
+
+    if cached is not None:
+        old_tips, log = cached
+        if old_tips == tips:
+            return log
+
+        if not is_history_rewritten(old_tips, tips, cwd=cwd):
+            new_log = gitcommit.git_log(*tips, '--not', *old_tips, cwd=cwd)
+            if len(new_log) != 0:
+                log = new_log + b'\n' + log if len(log) != 0 else new_log
+            cache.save(tips, log)
+            return log
+
+    log = gitcommit.git_log_sharded(shards, *tips, cwd=cwd)
+    cache.save(tips, log)
+    return log
+
+def update_rollup(
+    cache: typing.Optional[CommitCache] = None,
+    cwd: typing.Optional[str] = None,
+    shards: int = 1
+) -> Rollup:
+    """Returns the rollup of the history.
+
+    The cached log is only read if HEAD moved since the rollup was saved.
+    """
+    if cache is None:
+        cache = CommitCache(get_cache_dir(cwd))
+
+    tips = get_ref_tips(cwd)
+    rollup = cache.load_rollup(tips)
+    if rollup is None:
+        log = update_cache(cache=cache, cwd=cwd, shards=shards, tips=tips)
+        store = gitcommit.load_commit_store(log.split(b'\n'))
+        rollup = store.rollup()
+        cache.save_rollup(tips, rollup)
+    return rollup
+
+def get_commit_data(cache: typing.Optional[CommitCache] = None) -> typing.List[Commit]:
+    return list(gitcommit.iter_parse_commit_data(io.BytesIO(update_cache(cache))))
@@ -0,0 +1,333 @@
+"""Reads commit dates straight from git's commit-graph files, without running git.
+
+Only the committer time of each commit is stored in a commit-graph, so this can only be used
+when tables are bucketed by committer date and no table filters by author.
+"""
+
+from array import array
+import mmap
+import os
+import struct
+import time
+import typing
+
+SIGNATURE = b'CGPH'
+HASH_LENGTHS = {1: 20, 2: 32}
+
+CHUNK_FANOUT = b'OIDF'
+CHUNK_OID_LOOKUP = b'OIDL'
+CHUNK_COMMIT_DATA = b'CDAT'
+CHUNK_EXTRA_EDGES = b'EDGE'
+
+PARENT_NONE = 0x70000000
+PARENT_EXTRA_EDGES = 0x80000000
+EDGE_LAST = 0x80000000
+
+HEADER = struct.Struct('>4sBBBB')
+CHUNK_ENTRY = struct.Struct('>4sQ')
+COMMIT_DATA = struct.Struct('>IIII')
+UINT32 = struct.Struct('>I')
+
+class CommitGraphError(Exception):
+    pass
+
+class CommitGraphFile:
+    """One memory-mapped commit-graph file, a layer of a split commit-graph chain.
+
+    Commit positions are global across the chain, starting at base_count for this layer.
+    """
+
+    def __init__(self, path: str, base_count: int = 0):
+        self.path: str = path
+        self.base_count: int = base_count
+
+        with open(path, 'rb') as file:
+            self.data: mmap.mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        try:
+            self._parse()
+        except (struct.error, CommitGraphError):
+            self.data.close()
+            raise
+
+    def _parse(self) -> None:
+        signature, version, hash_version, chunk_count, _ = HEADER.unpack_from(self.data, 0)
+        if signature != SIGNATURE or version != 1 or hash_version not in HASH_LENGTHS:
+            raise CommitGraphError('unsupported commit-graph: %s' % self.path)
+        self.hash_length: int = HASH_LENGTHS[hash_version]
+
+        chunks: typing.Dict[bytes, int] = {}
+        for idx in range(chunk_count):
+            entry_offset = HEADER.size + idx * CHUNK_ENTRY.size
+            chunk_id, offset = CHUNK_ENTRY.unpack_from(self.data, entry_offset)
+            chunks[chunk_id] = offset
+
+        for chunk_id in [CHUNK_FANOUT, CHUNK_OID_LOOKUP, CHUNK_COMMIT_DATA]:
+            if chunk_id not in chunks:
+                raise CommitGraphError('commit-graph is missing the %s chunk: %s' % (
+                    chunk_id.decode('ascii'), self.path
+                ))
+
+        self.fanout_offset: int = chunks[CHUNK_FANOUT]
+        self.oid_offset: int = chunks[CHUNK_OID_LOOKUP]
+        self.data_offset: int = chunks[CHUNK_COMMIT_DATA]
+        self.edge_offset: typing.Optional[int] = chunks.get(CHUNK_EXTRA_EDGES)
+
+        self.commit_count: int = UINT32.unpack_from(self.data, self.fanout_offset + 255 * 4)[0]
+        self.data_size: int = self.hash_length + COMMIT_DATA.size
+        if self.data_offset + self.commit_count * self.data_size > len(self.data):
+            raise CommitGraphError('commit-graph is truncated: %s' % self.path)
+
+    def find(self, oid: bytes) -> typing.Optional[int]:
+        """Returns the global position of the commit, or None if it is not in this layer."""
+        first = oid[0]
+        low = 0
+        if first != 0:
+            low = UINT32.unpack_from(self.data, self.fanout_offset + (first - 1) * 4)[0]
+        high = UINT32.unpack_from(self.data, self.fanout_offset + first * 4)[0]
+
+        hash_length = self.hash_length
+        while low < high:
+            mid = (low + high) // 2
+            offset = self.oid_offset + mid * hash_length
+            current = self.data[offset:offset + hash_length]
+            if current == oid:
+                return self.base_count + mid
+            if current < oid:
+                low = mid + 1
+            else:
+                high = mid
+        return None
+
+    def commit_data(self, pos: int) -> typing.Tuple[int, int, int]:
+        """Returns the commit time and the two parent fields of the commit at a global position."""
+        offset = self.data_offset + (pos - self.base_count) * self.data_size + self.hash_length
+        parent1, parent2, gen_time, time_low = COMMIT_DATA.unpack_from(self.data, offset)
+        return ((gen_time & 0x3) << 32) | time_low, parent1, parent2
+
+    def extra_parents(self, idx: int) -> typing.List[int]:
+        if self.edge_offset is None:
+            raise CommitGraphError('commit-graph is missing the EDGE chunk: %s' % self.path)
+
+        parents = []
+        while True:
+            edge = UINT32.unpack_from(self.data, self.edge_offset + idx * 4)[0]
+            parents.append(edge & ~EDGE_LAST)
+            if edge & EDGE_LAST:
+                return parents
+            idx += 1
+
+    def close(self) -> None:
+        self.data.close()
+
+class CommitGraph:
+    """The commit-graph of a repository, either a single file or a chain of split layers."""
+
+    def __init__(self, layers: typing.List[CommitGraphFile]):
+        self.layers: typing.List[CommitGraphFile] = layers
+        self.commit_count: int = sum(map(lambda x: x.commit_count, layers))
+
+    @classmethod
+    def open(cls, objects_dir: str) -> typing.Optional['CommitGraph']:
+        info_dir = os.path.join(objects_dir, 'info')
+        path = os.path.join(info_dir, 'commit-graph')
+        if os.path.isfile(path):
+            return cls([CommitGraphFile(path)])
+
+        chain_dir = os.path.join(info_dir, 'commit-graphs')
+        try:
+            with open(os.path.join(chain_dir, 'commit-graph-chain'), 'r', encoding='utf-8') as file:
+                hashes = file.read().split()
+        except OSError:
+            return None
+        if len(hashes) == 0:
+            return None
+
+        layers: typing.List[CommitGraphFile] = []
+        base_count = 0
+        try:
+            for graph_hash in hashes:
+                fname = os.path.join(chain_dir, 'graph-%s.graph' % graph_hash)
+                layer = CommitGraphFile(fname, base_count)
+                layers.append(layer)
+                base_count += layer.commit_count
+        except (OSError, ValueError, struct.error, CommitGraphError):
+            for layer in layers:
+                layer.close()
+            raise
+        return cls(layers)
+
+    def layer(self, pos: int) -> CommitGraphFile:
+        for layer in reversed(self.layers):
+            if pos >= layer.base_count:
+                return layer
+        raise CommitGraphError('commit position out of range: %d' % pos)
+
+    def find(self, oid: bytes) -> typing.Optional[int]:
+        for layer in reversed(self.layers):
+            pos = layer.find(oid)
+            if pos is not None:
+                return pos
+        return None
+
+    def reachable_times(self, tips: typing.Iterable[int]) -> array:
+        """Returns the commit times of every commit reachable from the given positions."""
+        seen = bytearray(self.commit_count)
+        times = array('q')
+        stack = []
+        for pos in tips:
+            if not seen[pos]:
+                seen[pos] = 1
+                stack.append(pos)
+
+        single = len(self.layers) == 1
+        layer = self.layers[0]
+        while len(stack) != 0:
+            pos = stack.pop()
+            if not single:
+                layer = self.layer(pos)
+            commit_time, parent1, parent2 = layer.commit_data(pos)
+            times.append(commit_time)
+
+            if parent1 == PARENT_NONE:
+                continue
+            parents = [parent1]
+            if parent2 & PARENT_EXTRA_EDGES:
+                parents.extend(layer.extra_parents(parent2 & ~PARENT_EXTRA_EDGES))
+            elif parent2 != PARENT_NONE:
+                parents.append(parent2)
+
+            for parent in parents:
+                if parent >= self.commit_count:
+                    raise CommitGraphError('commit parent position out of range: %d' % parent)
+                if not seen[parent]:
+                    seen[parent] = 1
+                    stack.append(parent)
+        return times
+
+    def close(self) -> None:
+        for layer in self.layers:
+            layer.close()
+
+def find_git_dir(path: str) -> typing.Optional[str]:
+    path = os.path.abspath(path)
+    while True:
+        dot_git = os.path.join(path, '.git')
+        if os.path.isdir(dot_git):
+            return dot_git
+        if os.path.isfile(dot_git):
+            # worktrees and submodules point to their git directory
+            with open(dot_git, 'r', encoding='utf-8') as file:
+                content = file.read().strip()
+            if content.startswith('gitdir:'):
+                return os.path.join(path, content[len('gitdir:'):].strip())
+            return None
+
+        parent = os.path.dirname(path)
+        if parent == path:
+            return None
+        path = parent
+
+def get_common_dir(git_dir: str) -> str:
+    try:
+        with open(os.path.join(git_dir, 'commondir'), 'r', encoding='utf-8') as file:
+            return os.path.join(git_dir, file.read().strip())
+    except OSError:
+        return git_dir
+
+def resolve_ref(git_dir: str, ref: str = 'HEAD') -> typing.Optional[str]:
+    """Returns the object id a ref points to, following symbolic refs, read from the ref files."""
+    common_dir = get_common_dir(git_dir)
+
+    for _ in range(10):
+        content = None
+        # HEAD and other per-worktree refs live in the git dir, branches in the common dir
+        for base in [git_dir, common_dir]:
+            try:
+                with open(os.path.join(base, ref), 'r', encoding='utf-8') as file:
+                    content = file.read().strip()
+                break
+            except OSError:
+                pass
+
+        if content is None:
+            content = read_packed_ref(common_dir, ref)
+            if content is None:
+                return None
+
+        if not content.startswith('ref:'):
+            return content
+        ref = content[len('ref:'):].strip()
+    return None
+
+def read_packed_ref(common_dir: str, ref: str) -> typing.Optional[str]:
+    try:
+        with open(os.path.join(common_dir, 'packed-refs'), 'r', encoding='utf-8') as file:
+            for line in file:
+                if line.startswith('#') or line.startswith('^'):
+                    continue
+                spl = line.split()
+                if len(spl) == 2 and spl[1] == ref:
+                    return spl[0]
+    except OSError:
+        pass
+    return None
+
+def has_commit_graph(path: typing.Optional[str] = None) -> bool:
+    """Returns whether the repository has a commit-graph, without checking that it is usable."""
+    git_dir = find_git_dir(path if path is not None else os.getcwd())
+    if git_dir is None:
+        return False
+
+    info_dir = os.path.join(get_common_dir(git_dir), 'objects', 'info')
+    return os.path.isfile(os.path.join(info_dir, 'commit-graph')) \
+        or os.path.isfile(os.path.join(info_dir, 'commit-graphs', 'commit-graph-chain'))
+
+def read_commit_times(path: typing.Optional[str] = None) -> typing.Optional[array]:
+    """Returns the committer times of the commits reachable from HEAD, in UTC seconds.
+
+    Returns None if the repository has no usable commit-graph, or if HEAD is not in it,
+    as happens when commits were made after the commit-graph was written.
+    """
+    git_dir = find_git_dir(path if path is not None else os.getcwd())
+    if git_dir is None:
+        return None
+
+    head = resolve_ref(git_dir)
+    if head is None:
+        return None
+    try:
+        oid = bytes.fromhex(head)
+    except ValueError:
+        return None
+
+    try:
+        graph = CommitGraph.open(os.path.join(get_common_dir(git_dir), 'objects'))
+    except (OSError, ValueError, struct.error, CommitGraphError):
+        return None
+    if graph is None:
+        return None
+
+    try:
+        if len(oid) != graph.layers[0].hash_length:
+            return None
+        pos = graph.find(oid)
+        if pos is None:
+            return None
+        return graph.reachable_times([pos])
+    except (struct.error, CommitGraphError):
+        return None
+    finally:
+        graph.close()
+
+def to_local_times(times: typing.Iterable[int]) -> typing.Iterator[int]:
+    """Converts UTC seconds to the machine's local time, the same as git's format-local dates."""
+    offsets: typing.Dict[int, int] = {}
+    for timestamp in times:
+        # since 1972 utc offsets, and the times they change at, are whole quarter hours
+        key = timestamp // 900
+        offset = offsets.get(key)
+        if offset is None:
+            offset = time.localtime(timestamp).tm_gmtoff
+            offsets[key] = offset
+        yield timestamp + offset
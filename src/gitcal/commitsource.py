@@ -0,0 +1,177 @@
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+import io
+import typing
+
+from . import commitcache, commitgraph, gitcommit
+from .bucket import BucketPlan, from_timestamp
+from .commitstore import CommitStore
+from .logbackend import LOG, LogBackend, select_backend
+from .profiling import Profiler, phase
+
+# the most repositories read from git at the same time
+MAX_READERS = 16
+
+class CommitSource:
+    def __init__(self, **kwargs):
+        self.use_cache: bool = kwargs.get('use_cache', False)
+        self.max_readers: int = kwargs.get('max_readers', MAX_READERS)
+        self.shards: int = kwargs.get('shards', 1)
+
+        # reads the history with this backend instead of picking the cheapest one that fits
+        self.backend: typing.Optional[LogBackend] = kwargs.get('backend')
+
+        # buckets commits by committer date in local time, read from the commit-graph when possible
+        self.committer_date: bool = kwargs.get('committer_date', False)
+
+        # times reading from git and parsing its output if set
+        self.profiler: typing.Optional[Profiler] = kwargs.get('profiler')
+
+        self._repos: typing.List[str] = list(kwargs.get('repos', []))
+        self._commits: typing.Optional[CommitStore] = None
+        self._users: typing.Optional[typing.Set[str]] = None
+
+        # commits already loaded, git is not run at all if given
+        commits: typing.Optional[CommitStore] = kwargs.get('commits')
+        if commits is not None:
+            if not commits.is_sorted:
+                commits = commits[:]
+                commits.sort()
+            self._commits = commits
+
+    @property
+    def repos(self) -> typing.List[str]:
+        """Paths of the repositories to read, the current directory if empty."""
+        return self._repos
+
+    def add_repo(self, path: str) -> None:
+        self._repos.append(path)
+        self._commits = None
+        self._users = None
+
+    @property
+    def commits(self) -> CommitStore:
+        """Commits in the order they were made, loaded from git on first access."""
+        if self._commits is None:
+            backend = self.get_backend(need_names=True)
+            if len(self._repos) > 1:
+                commits = self.load_repos(backend)
+            else:
+                commits = CommitStore()
+                for _, timestamp, author_name in self.iter_records(self.repo_path(), backend):
+                    commits.append(timestamp, author_name)
+                commits.reverse()
+            commits.sort()
+            self._commits = commits
+        return self._commits
+
+    @property
+    def users(self) -> typing.Set[str]:
+        if self._users is None:
+            self._users = gitcommit.get_users_from_commits(self.commits)
+        return self._users
+
+    def last_date(self) -> typing.Optional[datetime]:
+        """Returns the time of the newest commit, which ends the --all-users tables.
+
+        None if there is no commit, then the tables have no end.
+        """
+        if len(self.commits) == 0:
+            return None
+        return from_timestamp(self.commits.times[-1])
+
+    def repo_path(self) -> typing.Optional[str]:
+        return self._repos[0] if len(self._repos) != 0 else None
+
+    def get_backend(self, need_names: bool = False) -> LogBackend:
+        if self.backend is not None:
+            return self.backend
+        if self.use_cache and not self.committer_date:
+            # the cache always holds the full log
+            return LOG
+        return select_backend(need_names=need_names, committer_date=self.committer_date)
+
+    def uses_cache(self, backend: LogBackend) -> bool:
+        return self.use_cache and backend is LOG
+
+    def read_graph_times(
+        self,
+        repo: typing.Optional[str],
+        backend: LogBackend
+    ) -> typing.Optional[array]:
+        """Returns the sorted local commit times from the commit-graph, if the backend allows it."""
+        if not backend.committer_date or backend.has_names:
+            return None
+        with phase(self.profiler, 'commit_graph'):
+            times = commitgraph.read_commit_times(repo)
+            if times is None:
+                return None
+            return array('q', sorted(commitgraph.to_local_times(times)))
+
+    def iter_records(
+        self,
+        repo: typing.Optional[str] = None,
+        backend: LogBackend = LOG
+    ) -> typing.Iterator[typing.Tuple[str, int, str]]:
+        if self.profiler is not None:
+            # git, parsing and counting run one after another so each is timed on its own
+            with phase(self.profiler, 'git'):
+                log = self.read_log(repo, backend)
+            with phase(self.profiler, 'parse'):
+                records = list(backend.iter_records(log.split(b'\n')))
+            return iter(records)
+
+        if self.uses_cache(backend) or self.shards > 1:
+            lines = io.BytesIO(self.read_log(repo, backend))
+        else:
+            lines = gitcommit.iter_git_log(cwd=repo, backend=backend)
+        return backend.iter_records(lines)
+
+    def read_log(self, repo: typing.Optional[str] = None, backend: LogBackend = LOG) -> bytes:
+        if self.uses_cache(backend):
+            return commitcache.update_cache(cwd=repo, shards=self.shards)
+        return gitcommit.git_log_sharded(self.shards, cwd=repo, backend=backend)
+
+    def load_repos(self, backend: LogBackend = LOG) -> CommitStore:
+        """Reads the logs of all repositories concurrently and merges them into one store."""
+        commits = CommitStore()
+        max_workers = max(1, min(self.max_readers, len(self._repos)))
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            # git runs in the worker threads, the logs are parsed here as each one finishes in order
+            logs: typing.Iterable[bytes] = executor.map(
+                lambda repo: self.read_log(repo, backend),
+                self._repos
+            )
+            if self.profiler is not None:
+                with phase(self.profiler, 'git'):
+                    logs = list(logs)
+
+            with phase(self.profiler, 'parse'):
+                for log in logs:
+                    for _, timestamp, author_name in backend.iter_records(log.split(b'\n')):
+                        commits.append(timestamp, author_name)
+        return commits
+
+    def fold(self, plan: BucketPlan) -> None:
+        """Counts every commit into the plan, streaming from git if the history was not loaded.
+
+        When streaming, author names are only read from git if a table filters by author. Loaded
+        and cached histories are counted from their rollups, which are kept with the commits in
+        memory and saved next to the cache on disk.
+        """
+        if self._commits is None and len(self._repos) <= 1:
+            backend = self.get_backend(need_names=plan.needs_authors())
+            times = self.read_graph_times(self.repo_path(), backend)
+            if times is not None:
+                plan.add_sorted_times(times, {})
+            elif self.uses_cache(backend):
+                with phase(self.profiler, 'rollup'):
+                    rollup = commitcache.update_rollup(cwd=self.repo_path(), shards=self.shards)
+                plan.add_rollup(rollup)
+            else:
+                for _, timestamp, author_name in self.iter_records(self.repo_path(), backend):
+                    plan.add(timestamp, author_name)
+        else:
+            plan.add_rollup(self.commits.rollup())
+        plan.finish()
@@ -0,0 +1,178 @@
+from array import array
+import bisect
+from itertools import islice
+import operator
+import typing
+
+from .bucket import Rollup
+from .commit import Commit
+
+class CommitStore:
+    """Commits stored column by column to keep large histories small in memory.
+
+    Timestamps are stored as seconds in an array and authors as indices into a table of
+    unique author names. Short hashes are only kept if keep_hashes is set.
+    """
+
+    def __init__(self, keep_hashes: bool = False):
+        self.times: array = array('q')
+        self.author_ids: array = array('i')
+        self.authors: typing.List[str] = []
+        self.hashes: typing.Optional[typing.List[str]] = [] if keep_hashes else None
+
+        self._author_id_map: typing.Dict[str, int] = {}
+        self._author_index: typing.Optional[typing.Dict[str, array]] = None
+        self._rollup: typing.Optional[Rollup] = None
+        self._is_sorted: bool = True
+
+    @classmethod
+    def from_commits(
+        cls,
+        commits: typing.Iterable[Commit],
+        keep_hashes: bool = False
+    ) -> 'CommitStore':
+        store = cls(keep_hashes=keep_hashes)
+        for commit in commits:
+            store.append(commit.timestamp, commit.author_name, commit.shorthash)
+        return store
+
+    def append(
+        self,
+        timestamp: int,
+        author_name: str,
+        shorthash: typing.Optional[str] = None
+    ) -> None:
+        self._author_index = None
+        self._rollup = None
+        if len(self.times) != 0 and timestamp < self.times[-1]:
+            self._is_sorted = False
+        self.times.append(timestamp)
+        self.author_ids.append(self.author_id(author_name))
+        if self.hashes is not None:
+            self.hashes.append(shorthash)
+
+    def copy(self) -> 'CommitStore':
+        """Returns a copy that can be appended to without changing this store."""
+        store = self[:]
+        store.authors = list(self.authors)
+        store._author_id_map = dict(self._author_id_map) # pylint: disable=protected-access
+        return store
+
+    def author_id(self, author_name: str) -> int:
+        author_id = self._author_id_map.get(author_name)
+        if author_id is None:
+            author_id = len(self.authors)
+            self._author_id_map[author_name] = author_id
+            self.authors.append(author_name)
+        return author_id
+
+    def reverse(self) -> None:
+        self._author_index = None
+        self._rollup = None
+        self.times.reverse()
+        self.author_ids.reverse()
+        if self.hashes is not None:
+            self.hashes.reverse()
+        self._is_sorted = all(map(operator.le, self.times, islice(self.times, 1, None)))
+
+    @property
+    def is_sorted(self) -> bool:
+        return self._is_sorted
+
+    def sort(self) -> None:
+        """Sorts the commits by timestamp, keeping the order of commits made at the same time."""
+        if self._is_sorted:
+            return
+
+        times = self.times
+        order = sorted(range(len(times)), key=times.__getitem__)
+
+        self.times = array('q', map(times.__getitem__, order))
+        self.author_ids = array('i', map(self.author_ids.__getitem__, order))
+        if self.hashes is not None:
+            self.hashes = list(map(self.hashes.__getitem__, order))
+        self._is_sorted = True
+
+    def window(
+        self,
+        start_time: typing.Optional[int] = None,
+        end_time: typing.Optional[int] = None
+    ) -> typing.Tuple[int, int]:
+        """Returns the index range of the commits made from start_time through end_time."""
+        self.sort()
+        low = 0 if start_time is None else bisect.bisect_left(self.times, start_time)
+        high = len(self.times) if end_time is None else bisect.bisect_right(self.times, end_time)
+        return low, max(low, high)
+
+    def users(self) -> typing.Set[str]:
+        if self._author_index is not None:
+            return set(self._author_index)
+        authors = self.authors
+        return set(map(lambda x: authors[x], set(self.author_ids)))
+
+    def author_index(self) -> typing.Dict[str, array]:
+        """Returns the sorted commit timestamps of each author.
+
+        Built once and kept until the store changes.
+        """
+        if self._author_index is None:
+            author_times: typing.List[typing.List[int]] = [ [] for _ in range(len(self.authors)) ]
+            for timestamp, author_id in zip(self.times, self.author_ids):
+                author_times[author_id].append(timestamp)
+
+            index = {}
+            for author_id, times in enumerate(author_times):
+                if len(times) != 0:
+                    times.sort()
+                    index[self.authors[author_id]] = array('q', times)
+            self._author_index = index
+        return self._author_index
+
+    def rollup(self) -> Rollup:
+        """Returns the commit counts summed into rollup levels.
+
+        Built once and kept until the store changes.
+        """
+        if self._rollup is None:
+            self.sort()
+            self._rollup = Rollup(self.times, self.author_index())
+        return self._rollup
+
+    def iter_records(self) -> typing.Iterator[typing.Tuple[int, str]]:
+        authors = self.authors
+        for timestamp, author_id in zip(self.times, self.author_ids):
+            yield timestamp, authors[author_id]
+
+    def commit(self, idx: int) -> Commit:
+        return Commit(
+            self.hashes[idx] if self.hashes is not None else '',
+            self.times[idx],
+            self.authors[self.author_ids[idx]]
+        )
+
+    def __len__(self) -> int:
+        return len(self.times)
+
+    def __iter__(self) -> typing.Iterator[Commit]:
+        for idx in range(len(self.times)):
+            yield self.commit(idx)
+
+    def __getitem__(self, key: typing.Union[int, slice]) -> typing.Union[Commit, 'CommitStore']:
+        if isinstance(key, slice):
+            store = CommitStore(keep_hashes=self.hashes is not None)
+            store.times = self.times[key]
+            store.author_ids = self.author_ids[key]
+            store._is_sorted = self._is_sorted and (key.step is None or key.step > 0) # pylint: disable=protected-access
+            if self.hashes is not None:
+                store.hashes = self.hashes[key]
+
+            # the author table is shared, so ids stay valid without remapping
+            store.authors = self.authors
+            store._author_id_map = self._author_id_map # pylint: disable=protected-access
+            return store
+
+        if key < 0:
+            key += len(self.times)
+        if key < 0 or key >= len(self.times):
+            raise IndexError('commit index out of range')
+        return self.commit(key)
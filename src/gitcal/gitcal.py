@@ -1,56 +1,172 @@
 from argparse import Namespace
 import typing
 
+from .bucket import BucketCounter, BucketPlan, to_timestamp
+from .commit import Commit
+from .commitsource import CommitSource
+from .commitstore import CommitStore
+from .profiling import Profiler, phase
+from .sparsegrid import SparseGrid
 from .table import Table, CellInfo
 from .tableconfig import TableConfig
-from .gitcommit import create_table_from_commits, get_commit_data
+from .gitcommit import create_table_from_counter
 
-def draw_tables(argspace: Namespace, table_configs: typing.List[TableConfig]) -> str:
+CommitsLike = typing.Union[CommitSource, CommitStore, str, typing.Iterable[Commit]]
+
+def build_tables(
+    commits: CommitsLike,
+    table_configs: typing.List[TableConfig],
+    profiler: typing.Optional[Profiler] = None
+) -> typing.List[Table]:
+    """Counts commits into a table for each config and collapses them.
+
+    Commits are given as a commit source, a commit store, an iterable of commits, or the path of a
+    repository. git is only run for a repository path or a commit source that has not loaded
+    its commits yet. Commit times are ints of the author's local wall clock time in seconds since
+    1970-01-01, not datetimes or UTC epochs, see bucket.to_timestamp.
+    """
+    return create_tables_from_source(get_commit_source(commits, profiler), table_configs, profiler)
+
+def render_tables(tables: typing.List[Table], spacing: int = 2) -> str:
+    """Draws the tables side by side."""
+    return Table.draw_tables(tables, spacing=spacing)
+
+def get_commit_source(
+    commits: CommitsLike,
+    profiler: typing.Optional[Profiler] = None
+) -> CommitSource:
+    if isinstance(commits, CommitSource):
+        return commits
+    if isinstance(commits, str):
+        return CommitSource(repos=[commits], profiler=profiler)
+    if not isinstance(commits, CommitStore):
+        commits = CommitStore.from_commits(commits)
+    return CommitSource(commits=commits, profiler=profiler)
+
+def draw_tables(
+    argspace: Namespace,
+    table_configs: typing.List[TableConfig],
+    commit_source: typing.Optional[CommitSource] = None,
+    profiler: typing.Optional[Profiler] = None
+) -> str:
+    if profiler is not None:
+        lines = list(draw_tables_iter(argspace, table_configs, commit_source, profiler))
+        return '\n'.join(lines) + '\n' if len(lines) != 0 else ''
+
+    return Table.draw_tables(
+        create_tables(argspace, table_configs, commit_source),
+        spacing=argspace.spacing,
+    )
+
+def draw_tables_iter(
+    argspace: Namespace,
+    table_configs: typing.List[TableConfig],
+    commit_source: typing.Optional[CommitSource] = None,
+    profiler: typing.Optional[Profiler] = None
+) -> typing.Generator[str, None, None]:
+    lines = Table.draw_tables_iter(
+        create_tables(argspace, table_configs, commit_source, profiler),
+        spacing=argspace.spacing,
+    )
+    if profiler is None:
+        yield from lines
+        return
+
+    for line in profiler.iter_phase('render', lines):
+        profiler.count('output_bytes', len(line.encode('utf-8')) + 1)
+        yield line
+
+def create_tables(
+    argspace: Namespace,
+    table_configs: typing.List[TableConfig],
+    commit_source: typing.Optional[CommitSource] = None,
+    profiler: typing.Optional[Profiler] = None
+) -> typing.List[Table]:
+    """Counts the commits into tables and collapses them.
+
+    If a profiler is given, the time and memory of each phase is recorded in it. Reading from git
+    is only profiled if the commit source was created with the same profiler.
+    """
+    if commit_source is None:
+        commit_source = CommitSource(use_cache=argspace.cache, profiler=profiler)
+    return create_tables_from_source(commit_source, table_configs, profiler)
+
+def create_tables_from_source(
+    commit_source: CommitSource,
+    table_configs: typing.List[TableConfig],
+    profiler: typing.Optional[Profiler] = None
+) -> typing.List[Table]:
+    plan, counters = create_plan(table_configs)
+    with phase(profiler, 'bucket'):
+        commit_source.fold(plan)
+    if profiler is not None:
+        profiler.count('commits', plan.commit_count)
+
+    with phase(profiler, 'tables'):
+        tablelist = create_tables_from_counters(table_configs, counters)
+    if profiler is not None:
+        profiler.count('buckets', sum(map(lambda x: len(x.data) * x.config.col, tablelist)))
+
+    with phase(profiler, 'collapse'):
+        do_collapses(tablelist)
+    if profiler is not None:
+        profiler.count('rows', sum(map(lambda x: len(x.data), tablelist)))
+    return tablelist
+
+def create_plan(
+    table_configs: typing.List[TableConfig]
+) -> typing.Tuple[BucketPlan, typing.List[BucketCounter]]:
+    """Returns a plan with a counter for each table config, in the same order."""
+    plan = BucketPlan()
+    counters = [
+        plan.counter(
+            cfg.delta,
+            start=cfg.start,
+            end=cfg.end,
+            filter_names=cfg.filter_names,
+        ) for cfg in table_configs
+    ]
+    return plan, counters
+
+def create_tables_from_counters(
+    table_configs: typing.List[TableConfig],
+    counters: typing.List[BucketCounter]
+) -> typing.List[Table]:
     cell_bordered = CellInfo(
         width=4,
         height=3,
         has_border=True,
         drawcell=draw_cell_bordered,
-        getval=getval
+        getval=getval,
+        getclass=getclass
     )
     cell_unborder = CellInfo(
         width=2,
         height=1,
         has_border=False,
         drawcell=draw_cell_unborder,
-        getval=getval
+        getval=getval,
+        getclass=getclass
     )
 
-    commits = get_commit_data()
-    commits.reverse()
-
     tablelist = []
 
-    for cfg in table_configs:
-        tbl = create_table_from_commits(
+    for cfg, counter in zip(table_configs, counters):
+        tbl = create_table_from_counter(
             cell_bordered if cfg.border else cell_unborder,
-            commits,
+            counter,
             col_count=cfg.col,
             make_labels=cfg.label,
             labels_inclusive=cfg.label_inclusive,
             long_labels=cfg.long_label,
-            delta=cfg.delta,
-            start_date=cfg.start,
-            end_date=cfg.end,
-            filter_names=cfg.filter_names,
+            end_time=to_timestamp(cfg.end) if cfg.end is not None else None,
         )
         tbl.config = cfg
         tbl.table_name = cfg.tbl_name
         tbl.label_left = cfg.label_left
         tbl.label_sep = cfg.label_sep
         tablelist.append(tbl)
-
-    do_collapses(tablelist)
-
-    return Table.draw_tables(
-        tablelist,
-        spacing=argspace.spacing,
-    )
+    return tablelist
 
 def do_collapses(tablelist: typing.List[Table]) -> None:
     idx = 0
@@ -75,56 +191,74 @@ def do_collapses(tablelist: typing.List[Table]) -> None:
         idx += 1
 
 def collapse_tables(tablelist: typing.List[Table], consecutive: int) -> None:
-    def empty(row: typing.List[int]) -> bool:
-        for val in row:
-            if val != 0:
-                return False
-        return True
+    row_count = max(map(lambda x: len(x.data), tablelist))
 
-    last_empty: typing.Optional[int] = None
-    idx = 0
+    # a row is only checked against the tables that are long enough to have it
+    nonempty: typing.Set[int] = set()
+    for tbl in tablelist:
+        nonempty.update(get_nonempty_rows(tbl))
 
-    row_count = max(map(lambda x: len(x.data), tablelist))
+    runs: typing.List[typing.Tuple[int, int]] = []
+    last = -1
+    for idx in sorted(nonempty) + [row_count]:
+        if idx - last - 1 >= max(consecutive, 1):
+            runs.append((last + 1, idx))
+        last = idx
 
-    while idx < row_count:
-        new_tbls = []
-        for tbl in tablelist:
-            if idx < len(tbl.data):
-                new_tbls.append(tbl)
-        tablelist = new_tbls
-
-        all_empty = True
-        for tbl in tablelist:
-            if not empty(tbl.data[idx]):
-                all_empty = False
-                break
-        if all_empty:
-            if last_empty is None:
-                last_empty = idx
-            idx += 1
-            if idx != row_count:
-                continue
-
-        if last_empty is None:
-            idx += 1
-            continue
-
-        if idx - last_empty >= consecutive:
-            for tbl in tablelist:
-                tbl.data = tbl.data[:last_empty] + [[-1] * len(tbl.data[0])] + tbl.data[idx:]
-                if tbl.has_labels():
-                    labels = tbl.row_labels
-                    if isinstance(labels, dict):
-                        for i in range(last_empty, idx):
-                            if i in labels:
-                                del labels[i]
-                        tbl.row_labels = labels
-                    else:
-                        tbl.row_labels = labels[:last_empty] + [''] + labels[idx:]
-            row_count = max(map(lambda x: len(x.data), tablelist))
-            idx -= idx - last_empty - 1
-        last_empty = None
-        idx += 1
+    if len(runs) == 0:
+        return
+
+    for tbl in tablelist:
+        collapse_table_runs(tbl, [
+            # a run at the end collapses the longest tables,
+            # otherwise the tables that continue past it
+            run for run in runs if len(tbl.data) > min(run[1], row_count - 1)
+        ])
+
+def get_nonempty_rows(tbl: Table) -> typing.Iterable[int]:
+    if isinstance(tbl.data, SparseGrid):
+        return tbl.data.rows.keys()
+    return [ idx for idx, row in enumerate(tbl.data) if any(row) ]
+
+def collapse_table_runs(tbl: Table, runs: typing.List[typing.Tuple[int, int]]) -> None:
+    if len(runs) == 0:
+        return
+
+    data: typing.Union[typing.List[typing.List[int]], SparseGrid]
+    if isinstance(tbl.data, SparseGrid):
+        data = tbl.data.collapse(runs)
+    else:
+        marker = [-1] * len(tbl.data[0])
+        data = []
+        last = 0
+        for start, end in runs:
+            data.extend(tbl.data[last:start])
+            data.append(list(marker))
+            last = end
+        data.extend(tbl.data[last:])
+
+    labels = tbl.row_labels
+    if not tbl.has_labels():
+        pass
+    elif isinstance(labels, dict):
+        # label keys are not shifted by the collapsed rows
+        shift = 0
+        for start, end in runs:
+            for i in range(start - shift, end - shift):
+                labels.pop(i, None)
+            shift += end - start - 1
+    else:
+        new_labels: typing.List[str] = []
+        last = 0
+        for start, end in runs:
+            new_labels.extend(labels[last:start])
+            new_labels.append('')
+            last = end
+        new_labels.extend(labels[last:])
+        labels = new_labels
+
+    tbl.data = data
+    tbl.row_labels = labels
 
 def draw_cell_bordered(val) -> typing.Generator[str, None, None]:
     yield '+--+'
@@ -162,6 +296,22 @@ def getval(tbl: Table, val: int, col: int = -1, row: int = -1) -> str:
     color = '\x1b[30;43m' if val < tbl.config.threshold else '\x1b[30;42m'
     return '%s%s\x1b[39;49m' % (color, celldata)
 
+def getclass(tbl: Table, val: int, col: int = -1, row: int = -1) -> typing.Hashable:
+    if val <= 0:
+        return val
+
+    celldata = 0
+    underline = False
+    if tbl.config.num:
+        celldata = min(val, 100)
+        underline = (
+            not tbl.cell_info.has_border
+            and tbl.config.color
+            and col != -1 and row != -1 and (col & 1) == 1
+            and is_val_touching_adjacent(tbl, val, col, row)
+        )
+    return celldata, underline, tbl.config.color and val < tbl.config.threshold
+
 def is_val_touching_adjacent(tbl: Table, val: int, col: int, row: int) -> bool:
     return (
         val > 9 and col > 0 and tbl.data[row][col - 1] != 0
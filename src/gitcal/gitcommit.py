@@ -1,130 +1,107 @@
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
+import os
 import subprocess
 import typing
 
+from . import commitgraph
+from .bucket import SECONDS_PER_DAY, BucketCounter, BucketPlan, from_timestamp, to_timestamp
+from .commit import Commit
+from .commitstore import CommitStore
+from .logbackend import LOG, LOG_DATE_FORMAT, LOG_FORMAT, LogBackend, parse_tz_offset # pylint: disable=unused-import
 from .table import CellInfo, Table
 
-class Commit:
-    def __init__(self, shorthash: str, dtime: datetime, name: str):
-        self.shorthash: str = shorthash
-        self.datetime: datetime = dtime
-        self.author_name: str = name
-
-    def json(self) -> dict:
-        return {
-            'shorthash': self.shorthash,
-            'datetime': str(self.datetime),
-            'author_name': self.author_name
-        }
-
-def create_table_from_commits(cell_info: CellInfo, commits: typing.List[Commit], **kwargs) -> Table:
+def create_table_from_commits(
+    cell_info: CellInfo,
+    commits: typing.Union[CommitStore, typing.Iterable[Commit]],
+    **kwargs
+) -> Table:
+    plan = BucketPlan()
+    counter = plan.counter(
+        kwargs.get('delta', timedelta(days=1)),
+        start=kwargs.get('start_date'),
+        end=kwargs.get('end_date'),
+        filter_names=kwargs.get('filter_names'),
+    )
+    if isinstance(commits, CommitStore):
+        if not commits.is_sorted:
+            commits = commits[:]
+            commits.sort()
+        plan.add_sorted_times(commits.times, commits.author_index())
+    else:
+        for commit in commits:
+            plan.add(commit.timestamp, commit.author_name)
+    plan.finish()
+
+    return create_table_from_counter(cell_info, counter, **kwargs)
+
+def create_table_from_counter(cell_info: CellInfo, counter: BucketCounter, **kwargs) -> Table:
     col_count: int = kwargs.get('col_count', 7)
     make_labels: bool = kwargs.get('make_labels', True)
     labels_inclusive: bool = kwargs.get('labels_inclusive', True)
     long_labels: bool = kwargs.get('long_labels', True)
 
-    delta: timedelta = kwargs.get('delta', timedelta(days=1))
-    start_date: typing.Optional[datetime] = kwargs.get('start_date')
-    end_date: typing.Optional[datetime] = kwargs.get('end_date')
+    # rows are added up to end_time even if the counter counted up to a later time
+    end_time: typing.Optional[int] = kwargs.get('end_time', counter.end_time)
 
-    filter_names: typing.Optional[typing.List[str]] = kwargs.get('filter_names')
-    if filter_names is None:
-        filter_names = []
+    delta = counter.delta
+    delta_secs = counter.delta_seconds
+    start_time = counter.start_time
 
     tbl = Table(cell_info)
+    if counter.first_time is None:
+        return tbl
 
-    data = []
-    row = []
-    labels = []
-    start_idx = 0
-    counter = 0
+    first_time = counter.first_time
 
-    first_date = commits[0].datetime
+    if start_time is None:
+        ideal_date = get_ideal_startdate(from_timestamp(first_time), delta)
+        if ideal_date is not None:
+            ideal_time = to_timestamp(ideal_date)
+            if end_time is None or ideal_time < end_time:
+                start_time = ideal_time
 
-    if start_date is None:
-        ideal_date = get_ideal_startdate(first_date, delta)
-        if ideal_date is not None and (end_date is None or ideal_date < end_date):
-            start_date = ideal_date
-
-    if start_date is not None:
-        if start_date > first_date:
-            while start_idx < len(commits) and commits[start_idx].datetime < start_date:
-                start_idx += 1
-            if start_idx == len(commits):
+    if start_time is not None:
+        if start_time > first_time:
+            if counter.first_time_after_start is None:
                 return tbl
-            first_date = commits[start_idx].datetime
-        else:
-            first_date = start_date
-
-    curdate = datetime(first_date.year, first_date.month, first_date.day)
-    if make_labels:
-        labels.append(shortdate(
-            curdate,
-            delta,
-            include_year=long_labels,
-        ))
-    curdate += delta
-
-    def append(val: int) -> None:
-        nonlocal curdate, row
-
-        row.append(val)
-        if len(row) == col_count:
-            data.append(row)
-            row = []
-
-            if make_labels:
-                labels[-1] += ' - %s' % shortdate(
-                    (curdate - delta) if labels_inclusive else curdate,
-                    delta,
-                    include_year=long_labels,
-                )
-                labels.append(shortdate(
-                    curdate,
-                    delta,
-                    include_year=long_labels,
-                ))
-
-        curdate += delta
-
-    if start_date is not None:
-        while curdate < commits[0].datetime:
-            append(0)
-
-    for idx in range(start_idx, len(commits)):
-        commit = commits[idx]
-        if end_date is not None and commit.datetime > end_date:
-            break
-        if len(filter_names) != 0 and commit.author_name not in filter_names:
-            continue
-
-        if curdate < commit.datetime:
-            append(counter)
-            while curdate < commit.datetime:
-                append(0)
-
-            counter = 1
+            first_time = counter.first_time_after_start
         else:
-            counter += 1
+            first_time = start_time
 
-    if counter != 0:
-        append(counter)
+    origin = first_time - first_time % SECONDS_PER_DAY
 
-    if end_date is not None:
-        while curdate < end_date:
-            append(0)
+    bucket_count = 0
+    if start_time is not None:
+        # leading empty buckets are kept up to the earliest commit of any author
+        bucket_count = counter.bucket_index(origin, counter.first_time)
+    last_idx = counter.last_bucket_index(origin)
+    if last_idx is not None:
+        bucket_count = max(bucket_count, last_idx + 1)
+    if end_time is not None:
+        bucket_count = max(bucket_count, -(-(end_time - origin) // delta_secs) - 1)
 
-    if len(row) != 0:
-        data.append(row)
-        for _ in range(col_count - len(row)):
-            append(0)
+    row_count = -(-bucket_count // col_count)
+    tbl.data = counter.grid(origin, row_count, col_count)
 
-        data.pop()
-        if make_labels:
-            labels.pop()
-
-    tbl.data = data
     if make_labels:
+        def label(idx: int) -> str:
+            return shortdate(
+                from_timestamp(origin + idx * delta_secs),
+                delta,
+                include_year=long_labels,
+            )
+
+        labels = []
+        for row_idx in range(row_count):
+            row_start = row_idx * col_count
+            row_end = row_start + col_count
+            labels.append('%s - %s' % (
+                label(row_start),
+                label(row_end - 1 if labels_inclusive else row_end)
+            ))
+        if bucket_count % col_count == 0:
+            labels.append(label(row_count * col_count))
         tbl.row_labels = labels
 
     return tbl
@@ -150,22 +127,112 @@ def shortdate(dtime: datetime, delta: timedelta, include_year: bool = True) -> s
         return '%02d-%02d %02dh' % (dtime.month, dtime.day, dtime.hour)
     return str(dtime)
 
+def git_log(*revs: str, cwd: typing.Optional[str] = None, backend: LogBackend = LOG) -> bytes:
+    return subprocess.check_output(backend.args(*revs), cwd=cwd)
+
+def iter_git_log(
+    *revs: str,
+    cwd: typing.Optional[str] = None,
+    backend: LogBackend = LOG
+) -> typing.Iterator[bytes]:
+    with subprocess.Popen(backend.args(*revs), stdout=subprocess.PIPE, cwd=cwd) as proc:
+        yield from proc.stdout
+
+    if proc.returncode != 0:
+        raise subprocess.CalledProcessError(proc.returncode, proc.args)
+
+def git_log_sharded(
+    shards: int,
+    *revs: str,
+    cwd: typing.Optional[str] = None,
+    backend: LogBackend = LOG
+) -> bytes:
+    """Reads the log with one git process per shard of the history, running in parallel.
+
+    The output is ordered from the newest shard to the oldest. No more shards are used than
+    there are CPUs, since the shards only finish sooner if they run at the same time.
+    """
+    ranges = get_shard_ranges(min(shards, os.cpu_count() or 1), *revs, cwd=cwd)
+    if len(ranges) == 0:
+        return git_log(*revs, cwd=cwd, backend=backend)
+
+    with ThreadPoolExecutor(max_workers=len(ranges)) as executor:
+        logs = list(executor.map(lambda args: git_log(*args, cwd=cwd, backend=backend), ranges))
+    return b'\n'.join(filter(len, reversed(logs)))
+
+def get_shard_ranges(
+    shards: int,
+    *revs: str,
+    cwd: typing.Optional[str] = None
+) -> typing.List[typing.List[str]]:
+    """Returns the revisions to log for each shard, oldest first, empty if the history is not split.
+
+    The history is cut at commits evenly spaced along the first-parent chain of the tip. Each shard
+    is the commits reachable from one cut but not from the cut before it, so every commit is read
+    exactly once and git stops walking each shard at the cut below it.
+
+    Finding the cuts walks the first-parent chain, which is only much cheaper than reading the log
+    when git can use a commit-graph, so the history is not split without one.
+    """
+    if shards <= 1 or len(revs) > 1 or not commitgraph.has_commit_graph(cwd):
+        return []
+
+    tip = revs[0] if len(revs) != 0 else 'HEAD'
+    try:
+        chain = subprocess.check_output(
+            ['git', 'rev-list', '--first-parent', tip],
+            cwd=cwd, stderr=subprocess.DEVNULL
+        ).decode('utf-8').split()
+    except subprocess.CalledProcessError:
+        return []
+
+    # the chain is listed newest first
+    positions: typing.List[int] = []
+    for idx in range(1, shards):
+        pos = len(chain) * (shards - idx) // shards
+        if pos > 0 and (len(positions) == 0 or pos < positions[-1]):
+            positions.append(pos)
+    if len(positions) == 0:
+        return []
+
+    bounds = [ chain[pos] for pos in positions ] + [tip]
+    ranges = [[bounds[0]]]
+    for idx in range(1, len(bounds)):
+        ranges.append([bounds[idx], '--not', bounds[idx - 1]])
+    return ranges
+
 def get_commit_data() -> typing.List[Commit]:
-    output = subprocess.check_output([
-        'git', 'log',
-        '--pretty=format:%h %ad %an',
-        '--date=format:%Y%m%d%H%M%S'
-    ])
-    commits: typing.List[Commit] = []
-
-    for line in filter(lambda x: len(x) > 0, map(lambda x: x.decode('utf-8'), output.split(b'\n'))):
-        spl = line.split(' ')
-        shorthash = spl[0]
-        dtime = datetime.strptime(spl[1], '%Y%m%d%H%M%S')
-        name = ' '.join(spl[2:])
-
-        commits.append(Commit(shorthash, dtime, name))
-    return commits
-
-def get_users_from_commits(commits: typing.List[Commit]) -> typing.Set[str]:
+    return list(iter_commit_data())
+
+def iter_commit_data(*revs: str) -> typing.Iterator[Commit]:
+    return iter_parse_commit_data(iter_git_log(*revs))
+
+def parse_commit_data(output: bytes) -> typing.List[Commit]:
+    return list(iter_parse_commit_data(output.split(b'\n')))
+
+def iter_parse_commit_data(lines: typing.Iterable[bytes]) -> typing.Iterator[Commit]:
+    for shorthash, timestamp, name in iter_parse_commit_records(lines):
+        yield Commit(shorthash, timestamp, name)
+
+def iter_parse_commit_records(
+    lines: typing.Iterable[bytes],
+    backend: LogBackend = LOG
+) -> typing.Iterator[typing.Tuple[str, int, str]]:
+    return backend.iter_records(lines)
+
+def load_commit_store(
+    lines: typing.Iterable[bytes],
+    keep_hashes: bool = False,
+    backend: LogBackend = LOG
+) -> CommitStore:
+    store = CommitStore(keep_hashes=keep_hashes)
+    for shorthash, timestamp, name in iter_parse_commit_records(lines, backend):
+        store.append(timestamp, name, shorthash)
+    return store
+
+def get_users_from_commits(
+    commits: typing.Union[CommitStore, typing.Iterable[Commit]]
+) -> typing.Set[str]:
+    if isinstance(commits, CommitStore):
+        return commits.users()
     return set(map(lambda c: c.author_name, commits))
@@ -0,0 +1,76 @@
+import typing
+
+from . import commitcache, commitgraph, gitcommit
+from .commitstore import CommitStore
+from .logbackend import LOG_AUTHORS, LogBackend
+
+class RepoHistory:
+    """The commit history of one repository, read again from git only when HEAD moves.
+
+    Only the commits made since the last read are read from git, unless the history was rewritten.
+    """
+
+    def __init__(self, path: typing.Optional[str] = None, backend: LogBackend = LOG_AUTHORS):
+        self.path: typing.Optional[str] = path
+        self.backend: LogBackend = backend
+        self.tips: typing.Optional[typing.List[str]] = None
+        self.commits: CommitStore = CommitStore()
+
+    def read_tips(self) -> typing.List[str]:
+        # reading the ref files is much faster than running git,
+        # which is only needed if they cannot be read
+        git_dir = commitgraph.find_git_dir(self.path if self.path is not None else '.')
+        head = commitgraph.resolve_ref(git_dir) if git_dir is not None else None
+        if head is not None:
+            return [head]
+        return commitcache.get_ref_tips(self.path)
+
+    def read_commits(self, tips: typing.List[str]) -> typing.Tuple[CommitStore, bool]:
+        """Returns the sorted commits reachable from the tips that are not in the history.
+
+        Also returns whether they add to the history, which is not the case on the first read or
+        after the history was rewritten, when every commit is read again.
+        """
+        incremental = (
+            self.tips is not None
+            and not commitcache.is_history_rewritten(self.tips, tips, cwd=self.path)
+        )
+        if incremental:
+            log = gitcommit.git_log(*tips, '--not', *self.tips, cwd=self.path, backend=self.backend)
+        else:
+            log = gitcommit.git_log(*tips, cwd=self.path, backend=self.backend)
+
+        commits = CommitStore()
+        for _, timestamp, author_name in self.backend.iter_records(log.split(b'\n')):
+            commits.append(timestamp, author_name)
+        commits.reverse()
+        commits.sort()
+        return commits, incremental
+
+    def merge(self, commits: CommitStore, incremental: bool) -> CommitStore:
+        """Returns a new store with the commits added to the history.
+
+        The current store is not changed, so it can still be read while the new one is built.
+        """
+        if not incremental:
+            return commits
+
+        merged = self.commits.copy()
+        for timestamp, author_name in commits.iter_records():
+            merged.append(timestamp, author_name)
+        merged.sort()
+        return merged
+
+    def load(self, tips: typing.List[str]) -> CommitStore:
+        return self.merge(*self.read_commits(tips))
+
+    def update(self) -> typing.Optional[typing.Tuple[CommitStore, bool]]:
+        """Reads the new commits if HEAD moved, returning them like read_commits, or None."""
+        tips = self.read_tips()
+        if tips == self.tips:
+            return None
+
+        commits, incremental = self.read_commits(tips)
+        self.commits = self.merge(commits, incremental)
+        self.tips = tips
+        return commits, incremental
@@ -0,0 +1,145 @@
+import typing
+
+# %ad only supplies the author's timezone offset, tables are bucketed by the author's local time
+LOG_FORMAT = '--pretty=format:%h %at %ad %an'
+LOG_DATE_FORMAT = '--date=format:%z'
+
+Record = typing.Tuple[str, int, str]
+
+class LogBackend:
+    """A git command that lists the commit history, and the parser for its output.
+
+    Backends without hashes or author names yield empty strings in their place.
+    """
+
+    def __init__(self, **kwargs):
+        self.name: str = kwargs['name']
+        self.command: typing.List[str] = kwargs['command']
+        self.has_hashes: bool = kwargs.get('has_hashes', False)
+        self.has_names: bool = kwargs.get('has_names', False)
+
+        # committer times in the machine's local time instead of author times in the author's time
+        self.committer_date: bool = kwargs.get('committer_date', False)
+
+        # revisions used when none are given, for commands that do not default to HEAD
+        self.default_revs: typing.List[str] = kwargs.get('default_revs', [])
+
+    def args(self, *revs: str) -> typing.List[str]:
+        if all(map(lambda x: x.startswith('-'), revs)):
+            revs = (*revs, *self.default_revs)
+        return ['git', *self.command, *revs]
+
+    def satisfies(
+        self,
+        need_names: bool = False,
+        need_hashes: bool = False,
+        committer_date: bool = False
+    ) -> bool:
+        return (
+            (self.has_names or not need_names)
+            and (self.has_hashes or not need_hashes)
+            and self.committer_date == committer_date
+        )
+
+    def iter_records(self, lines: typing.Iterable[bytes]) -> typing.Iterator[Record]:
+        if self.has_hashes:
+            return iter_full_records(lines)
+        if self.has_names:
+            return iter_author_records(lines)
+        return iter_date_records(lines)
+
+def iter_full_records(lines: typing.Iterable[bytes]) -> typing.Iterator[Record]:
+    for line in lines:
+        line = line.rstrip(b'\n')
+        if len(line) == 0:
+            continue
+
+        spl = line.decode('utf-8').split(' ', 3)
+        yield spl[0], int(spl[1]) + parse_tz_offset(spl[2]), spl[3]
+
+def iter_author_records(lines: typing.Iterable[bytes]) -> typing.Iterator[Record]:
+    for line in lines:
+        line = line.rstrip(b'\n')
+        if len(line) == 0:
+            continue
+
+        spl = line.split(b' ', 2)
+        yield '', int(spl[0]) + parse_tz_offset_bytes(spl[1]), spl[2].decode('utf-8')
+
+def iter_date_records(lines: typing.Iterable[bytes]) -> typing.Iterator[Record]:
+    for line in lines:
+        spl = line.split()
+        if len(spl) == 0:
+            continue
+        yield '', int(spl[0]) + parse_tz_offset_bytes(spl[1]), ''
+
+def parse_tz_offset(offset: str) -> int:
+    seconds = int(offset[1:3]) * 3600 + int(offset[3:5]) * 60
+    return -seconds if offset[0] == '-' else seconds
+
+def parse_tz_offset_bytes(offset: bytes) -> int:
+    seconds = int(offset[1:3]) * 3600 + int(offset[3:5]) * 60
+    return -seconds if offset[0] == 45 else seconds # ord('-')
+
+LOG = LogBackend(
+    name='log',
+    command=['log', LOG_FORMAT, LOG_DATE_FORMAT],
+    has_hashes=True,
+    has_names=True,
+)
+LOG_AUTHORS = LogBackend(
+    name='log-authors',
+    command=['log', '--pretty=format:%at %ad %an', LOG_DATE_FORMAT],
+    has_names=True,
+)
+LOG_DATES = LogBackend(
+    name='log-dates',
+    command=['log', '--pretty=format:%at %ad', LOG_DATE_FORMAT],
+)
+# --no-commit-header needs git 2.33, so this backend is only used when selected by name
+REV_LIST_DATES = LogBackend(
+    name='rev-list-dates',
+    command=['rev-list', '--no-commit-header', '--format=%at %ad', LOG_DATE_FORMAT],
+    default_revs=['HEAD'],
+)
+
+LOG_COMMITTER_AUTHORS = LogBackend(
+    name='log-committer-authors',
+    command=['log', '--pretty=format:%ct %cd %an', '--date=format-local:%z'],
+    has_names=True,
+    committer_date=True,
+)
+LOG_COMMITTER_DATES = LogBackend(
+    name='log-committer-dates',
+    command=['log', '--pretty=format:%ct %cd', '--date=format-local:%z'],
+    committer_date=True,
+)
+
+# backends that are picked automatically, cheapest first
+AUTO_BACKENDS = [LOG_DATES, LOG_AUTHORS, LOG, LOG_COMMITTER_DATES, LOG_COMMITTER_AUTHORS]
+
+BACKENDS: typing.Dict[str, LogBackend] = {
+    backend.name: backend for backend in [
+        LOG,
+        LOG_AUTHORS,
+        LOG_DATES,
+        REV_LIST_DATES,
+        LOG_COMMITTER_AUTHORS,
+        LOG_COMMITTER_DATES,
+    ]
+}
+
+def select_backend(
+    need_names: bool = False,
+    need_hashes: bool = False,
+    committer_date: bool = False
+) -> LogBackend:
+    """Returns the cheapest backend whose output has the fields the tables need."""
+    for backend in AUTO_BACKENDS:
+        if backend.satisfies(
+            need_names=need_names,
+            need_hashes=need_hashes,
+            committer_date=committer_date
+        ):
+            return backend
+    return LOG
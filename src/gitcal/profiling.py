@@ -0,0 +1,119 @@
+import contextlib
+import json
+import time
+import tracemalloc
+import typing
+
+T = typing.TypeVar('T')
+
+class PhaseStats:
+    def __init__(self):
+        self.seconds: float = 0.0
+        self.calls: int = 0
+        self.peak_bytes: typing.Optional[int] = None
+
+    def to_dict(self) -> typing.Dict[str, typing.Any]:
+        return {
+            'seconds': round(self.seconds, 6),
+            'calls': self.calls,
+            'peak_bytes': self.peak_bytes,
+        }
+
+class _Frame:
+    def __init__(self, stats: PhaseStats, start: float, baseline: int):
+        self.stats: PhaseStats = stats
+        self.start: float = start
+        self.child_seconds: float = 0.0
+        self.baseline: int = baseline
+        self.peak: int = baseline
+
+class Profiler:
+    """Times the phases of a run and records the peak memory allocated in each of them.
+
+    A phase entered inside another phase is only counted in its own time, not in the time of the
+    phase around it. Peak memory is the most memory traced by tracemalloc during the phase above
+    what was traced when the phase was entered, including the phases inside it.
+    """
+
+    def __init__(self, **kwargs):
+        self.trace_memory: bool = kwargs.get('trace_memory', True)
+
+        self.phases: typing.Dict[str, PhaseStats] = {}
+        self.counts: typing.Dict[str, int] = {}
+
+        self._stack: typing.List[_Frame] = []
+        self._started_tracing: bool = False
+
+    @contextlib.contextmanager
+    def phase(self, name: str) -> typing.Iterator[None]:
+        stats = self.phases.get(name)
+        if stats is None:
+            stats = PhaseStats()
+            self.phases[name] = stats
+
+        baseline = 0
+        if self.trace_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._started_tracing = True
+            baseline, peak = tracemalloc.get_traced_memory()
+            if len(self._stack) != 0:
+                self._stack[-1].peak = max(self._stack[-1].peak, peak)
+            # before python 3.9 the peak cannot be reset, so it is the peak since tracing started
+            if hasattr(tracemalloc, 'reset_peak'):
+                tracemalloc.reset_peak()
+
+        frame = _Frame(stats, time.perf_counter(), baseline)
+        self._stack.append(frame)
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - frame.start
+            self._stack.pop()
+
+            stats.seconds += elapsed - frame.child_seconds
+            stats.calls += 1
+            if len(self._stack) != 0:
+                self._stack[-1].child_seconds += elapsed
+
+            if self.trace_memory and tracemalloc.is_tracing():
+                frame.peak = max(frame.peak, tracemalloc.get_traced_memory()[1])
+                stats.peak_bytes = max(stats.peak_bytes or 0, frame.peak - frame.baseline)
+                if len(self._stack) != 0:
+                    self._stack[-1].peak = max(self._stack[-1].peak, frame.peak)
+
+    def iter_phase(self, name: str, iterable: typing.Iterable[T]) -> typing.Iterator[T]:
+        """Yields the items of the iterable, counting the time spent producing them in the phase."""
+        iterator = iter(iterable)
+        while True:
+            with self.phase(name):
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+            yield item
+
+    def count(self, name: str, value: int = 1) -> None:
+        self.counts[name] = self.counts.get(name, 0) + value
+
+    def stop(self) -> None:
+        """Stops tracing memory if it was started by the profiler."""
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    def to_dict(self) -> typing.Dict[str, typing.Any]:
+        return {
+            'phases': { name: stats.to_dict() for name, stats in self.phases.items() },
+            'counts': dict(self.counts),
+        }
+
+    def write_json(self, file: typing.TextIO) -> None:
+        file.write(json.dumps(self.to_dict(), sort_keys=True))
+        file.write('\n')
+
+def phase(profiler: typing.Optional[Profiler], name: str) -> typing.ContextManager:
+    """Returns the phase of the profiler, or a context that does nothing if there is no profiler."""
+    if profiler is None:
+        return contextlib.suppress()
+    return profiler.phase(name)
@@ -0,0 +1,306 @@
+"""Serves calendars over HTTP from commit histories kept in memory.
+
+Usage: gitcal serve [--host HOST] [--port PORT | --socket PATH]
+                    [--repo PATH ...] [--repos-from FILE]
+
+Each repository is read from git once when the server starts. Before each request the tip of
+HEAD is checked, and only the commits made since the last check are read from git.
+
+Tables take the same options as the command line, either in a GET request:
+
+    GET /render?repo=PATH&arg=-d&arg=1h
+
+or in a POST request with a JSON body:
+
+    POST /render
+    {"repo": "PATH", "args": ["-d", "1h"]}
+
+The repo can be left out if the server only serves one repository.
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import signal
+import subprocess
+import sys
+import typing
+from urllib.parse import parse_qs, urlsplit
+
+from . import args, gitcal
+from .commitsource import CommitSource
+from .commitstore import CommitStore
+from .history import RepoHistory
+from .logbackend import LOG_AUTHORS
+
+# author names are needed for filters and --all-users, hashes are not
+BACKEND = LOG_AUTHORS
+
+MAX_BODY_SIZE = 1 << 20
+
+STATUS_REASONS = {
+    200: 'OK',
+    400: 'Bad Request',
+    404: 'Not Found',
+    405: 'Method Not Allowed',
+    413: 'Payload Too Large',
+    500: 'Internal Server Error',
+}
+
+class RequestError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status: int = status
+
+class ServedRepo(RepoHistory):
+    """A repository history shared by the requests of the server."""
+
+    def __init__(self, path: str):
+        super().__init__(path, BACKEND)
+        self.lock: asyncio.Lock = asyncio.Lock()
+
+    async def refresh(self) -> CommitStore:
+        """Returns the commits, reading the new ones from git first if HEAD moved.
+
+        Requests that arrive during a refresh wait for it instead of starting their own.
+        """
+        loop = asyncio.get_event_loop()
+        async with self.lock:
+            tips = await loop.run_in_executor(None, self.read_tips)
+            if tips != self.tips:
+                # requests may still be drawing tables from the current store,
+                # so it is replaced, not changed
+                self.commits = await loop.run_in_executor(None, self.load, tips)
+                self.tips = tips
+            return self.commits
+
+class ServedCommitSource(CommitSource):
+    """A commit source limited to the history the server already has in memory."""
+
+    def add_repo(self, path: str) -> None:
+        raise RequestError(400,
+            '--repo and --repos-from are not supported, use the repo parameter instead'
+        )
+
+def parse_request_args(
+    argv: typing.List[str],
+    commits: CommitStore
+) -> typing.Tuple[argparse.Namespace, typing.List[gitcal.TableConfig], CommitSource]:
+    commit_source = ServedCommitSource(commits=commits)
+
+    # argparse prints errors and help, and exits
+    output = io.StringIO()
+    try:
+        with contextlib.redirect_stdout(output), contextlib.redirect_stderr(output):
+            argspace, table_configs = args.parse_args(argv, commit_source)
+            args.append_table_config(argspace, table_configs, commit_source)
+    except SystemExit:
+        raise RequestError(400, output.getvalue()) from None
+    except ValueError as exc:
+        raise RequestError(400, str(exc)) from None
+
+    for option, is_set in [
+        ('--committer-date', commit_source.committer_date),
+        ('--cache', argspace.cache),
+        ('--shards', argspace.shards != 1),
+        ('--profile', argspace.profile is not None),
+        ('--watch', argspace.watch is not None),
+    ]:
+        if is_set:
+            raise RequestError(400, '%s is not supported by the server' % option)
+    return argspace, table_configs, commit_source
+
+class Server:
+    def __init__(self, repos: typing.List[str]):
+        self.repos: typing.List[str] = repos if len(repos) != 0 else [os.getcwd()]
+        self.histories: typing.Dict[str, ServedRepo] = {}
+
+    async def start(self) -> None:
+        """Reads the history of every repository."""
+        for repo in self.repos:
+            self.histories[os.path.realpath(repo)] = ServedRepo(repo)
+        await asyncio.gather(*[ history.refresh() for history in self.histories.values() ])
+
+    async def listen(
+        self,
+        host: str = '127.0.0.1',
+        port: int = 8080,
+        socket_path: typing.Optional[str] = None
+    ) -> asyncio.AbstractServer:
+        await self.start()
+        if socket_path is not None:
+            return await asyncio.start_unix_server(self.handle_connection, path=socket_path)
+        return await asyncio.start_server(self.handle_connection, host, port)
+
+    def get_history(self, repo: typing.Optional[str]) -> ServedRepo:
+        if repo is None:
+            if len(self.histories) != 1:
+                raise RequestError(400, 'repo must be given when serving more than one repository')
+            return next(iter(self.histories.values()))
+
+        history = self.histories.get(os.path.realpath(repo))
+        if history is None:
+            raise RequestError(404, 'repository is not served: %s' % repo)
+        return history
+
+    async def render(self, repo: typing.Optional[str], argv: typing.List[str]) -> str:
+        commits = await self.get_history(repo).refresh()
+        argspace, table_configs, commit_source = parse_request_args(argv, commits)
+
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(None, lambda: gitcal.render_tables(
+            gitcal.build_tables(commit_source, table_configs),
+            spacing=argspace.spacing,
+        ))
+
+    async def handle_request(self, method: str, target: str, body: bytes) -> str:
+        url = urlsplit(target)
+        if url.path != '/render':
+            raise RequestError(404, 'not found: %s' % url.path)
+
+        repo: typing.Optional[str]
+        argv: typing.List[str]
+        if method == 'GET':
+            query = parse_qs(url.query, keep_blank_values=True)
+            repo = query.get('repo', [None])[0]
+            argv = query.get('arg', [])
+        elif method == 'POST':
+            try:
+                data = json.loads(body.decode('utf-8'))
+            except ValueError:
+                raise RequestError(400, 'request body is not valid JSON') from None
+            if not isinstance(data, dict):
+                raise RequestError(400, 'request body must be a JSON object')
+
+            repo = data.get('repo')
+            argv = data.get('args', [])
+            if not isinstance(argv, list) or not all(map(lambda x: isinstance(x, str), argv)):
+                raise RequestError(400, 'args must be a list of strings')
+        else:
+            raise RequestError(405, 'method not allowed: %s' % method)
+
+        return await self.render(repo, argv)
+
+    async def handle_connection(
+        self,
+        reader: asyncio.StreamReader,
+        writer: asyncio.StreamWriter
+    ) -> None:
+        try:
+            try:
+                method, target, body = await read_request(reader)
+                status, text = 200, await self.handle_request(method, target, body)
+            except RequestError as exc:
+                status, text = exc.status, str(exc)
+            except subprocess.CalledProcessError as exc:
+                status, text = 500, 'git failed: %s' % exc
+            except Exception as exc: # pylint: disable=broad-except
+                status, text = 500, 'internal error: %r' % exc
+            write_response(writer, status, text)
+            await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+async def read_request(reader: asyncio.StreamReader) -> typing.Tuple[str, str, bytes]:
+    request_line = (await reader.readline()).decode('latin-1').split()
+    if len(request_line) != 3:
+        raise RequestError(400, 'malformed request line')
+    method, target, _ = request_line
+
+    headers: typing.Dict[str, str] = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+
+    try:
+        length = int(headers.get('content-length', '0'))
+    except ValueError:
+        raise RequestError(400, 'malformed content-length') from None
+    if length > MAX_BODY_SIZE:
+        raise RequestError(413, 'request body is too large')
+    body = await reader.readexactly(length) if length > 0 else b''
+    return method, target, body
+
+def write_response(writer: asyncio.StreamWriter, status: int, text: str) -> None:
+    body = text.encode('utf-8')
+    writer.write((
+        'HTTP/1.1 %d %s\r\n'
+        'Content-Type: text/plain; charset=utf-8\r\n'
+        'Content-Length: %d\r\n'
+        'Connection: close\r\n'
+        '\r\n' % (status, STATUS_REASONS.get(status, ''), len(body))
+    ).encode('latin-1'))
+    writer.write(body)
+
+def main(argv: typing.List[str]) -> None:
+    parser = argparse.ArgumentParser(
+        prog='gitcal serve',
+        description='Serve calendars over HTTP from commit histories kept in memory'
+    )
+    parser.add_argument('--host',
+        action='store', default='127.0.0.1',
+        help='address to listen on (default 127.0.0.1)'
+    )
+    parser.add_argument('--port',
+        action='store', type=int, default=8080,
+        help='port to listen on (default 8080)'
+    )
+    parser.add_argument('--socket',
+        action='store', metavar='PATH',
+        help='listen on a unix socket at PATH instead of a port'
+    )
+    parser.add_argument('--repo',
+        action='append', metavar='PATH', default=[],
+        help='serve the repository at PATH, can be given more than once'
+        + ' (default is the current directory)'
+    )
+    parser.add_argument('--repos-from',
+        action='store', metavar='FILE',
+        help='serve the repositories listed in FILE, one path per line'
+    )
+    argspace = parser.parse_args(argv)
+
+    repos = list(argspace.repo)
+    if argspace.repos_from is not None:
+        try:
+            repos.extend(args.read_repo_list(argspace.repos_from))
+        except OSError as exc:
+            parser.error('could not read repository list: %s' % exc)
+    for repo in repos:
+        if not os.path.isdir(repo):
+            parser.error('repository path does not exist: %s' % repo)
+
+    server = Server(repos)
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    listener = None
+    try:
+        listener = loop.run_until_complete(
+            server.listen(argspace.host, argspace.port, argspace.socket)
+        )
+        address = argspace.socket
+        if address is None:
+            address = '%s:%d' % (argspace.host, argspace.port)
+        print('serving on %s' % address, file=sys.stderr)
+        try:
+            loop.add_signal_handler(signal.SIGTERM, loop.stop)
+        except NotImplementedError: #pragma: no cover
+            pass
+        loop.run_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if listener is not None:
+            listener.close()
+            loop.run_until_complete(listener.wait_closed())
+        if argspace.socket is not None and os.path.exists(argspace.socket):
+            os.unlink(argspace.socket)
+        loop.close()
@@ -0,0 +1,97 @@
+import bisect
+import typing
+
+class SparseGrid:
+    """Rows of table cells where only the rows with a non-zero cell are stored.
+
+    Empty rows are created when they are accessed, so the grid can be indexed and
+    iterated like a list of rows.
+    """
+
+    def __init__(
+        self,
+        row_count: int,
+        col_count: int,
+        rows: typing.Optional[typing.Dict[int, typing.List[int]]] = None
+    ):
+        self.row_count: int = row_count
+        self.col_count: int = col_count
+        self.rows: typing.Dict[int, typing.List[int]] = rows if rows is not None else {}
+
+    @classmethod
+    def from_buckets(
+        cls,
+        buckets: typing.Dict[int, int],
+        row_count: int,
+        col_count: int
+    ) -> 'SparseGrid':
+        grid = cls(row_count, col_count)
+        rows = grid.rows
+        for idx, count in buckets.items():
+            row_idx, col = divmod(idx, col_count)
+            row = rows.get(row_idx)
+            if row is None:
+                row = [0] * col_count
+                rows[row_idx] = row
+            row[col] = count
+        return grid
+
+    def row(self, idx: int) -> typing.List[int]:
+        if idx < 0:
+            idx += self.row_count
+        if idx < 0 or idx >= self.row_count:
+            raise IndexError('grid row index out of range')
+
+        row = self.rows.get(idx)
+        if row is None:
+            return [0] * self.col_count
+        return row
+
+    def nonempty_rows(self) -> typing.List[int]:
+        return sorted(self.rows)
+
+    def collapse(self, runs: typing.List[typing.Tuple[int, int]]) -> 'SparseGrid':
+        """Returns a grid where each run of empty rows, given as sorted (start, end) ranges,
+        is replaced by a single row of -1.
+        """
+        ends = []
+        shifts = []
+        shift = 0
+        rows: typing.Dict[int, typing.List[int]] = {}
+
+        for start, end in runs:
+            rows[start - shift] = [-1] * self.col_count
+            shift += end - start - 1
+            ends.append(end)
+            shifts.append(shift)
+
+        for idx, row in self.rows.items():
+            run_idx = bisect.bisect_right(ends, idx)
+            rows[idx - (shifts[run_idx - 1] if run_idx != 0 else 0)] = row
+        return SparseGrid(self.row_count - shift, self.col_count, rows)
+
+    def __len__(self) -> int:
+        return self.row_count
+
+    def __iter__(self) -> typing.Iterator[typing.List[int]]:
+        for idx in range(self.row_count):
+            yield self.row(idx)
+
+    def __getitem__(
+        self,
+        key: typing.Union[int, slice]
+    ) -> typing.Union[typing.List[int], typing.List[typing.List[int]]]:
+        if isinstance(key, slice):
+            return list(map(self.row, range(*key.indices(self.row_count))))
+        return self.row(key)
+
+    def __eq__(self, other) -> bool:
+        try:
+            if len(other) != self.row_count:
+                return False
+            return all(map(lambda x: x[0] == x[1], zip(self, other)))
+        except TypeError:
+            return NotImplemented
+
+    def __repr__(self) -> str:
+        return 'SparseGrid(%d, %d, %r)' % (self.row_count, self.col_count, self.rows)
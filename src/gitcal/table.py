@@ -1,5 +1,6 @@
 import typing
 
+from .sparsegrid import SparseGrid
 from .tableconfig import TableConfig
 
 class CellInfo:
@@ -17,9 +18,87 @@ class CellInfo:
             str
         ] = kwargs.get('getval', lambda t, v, c, r: v)
 
+        # returns a hashable key that determines the output of getval, so cells with equal keys
+        # share the same drawn glyph. if not given, glyphs are keyed by the getval result
+        self.fnc_getclass: typing.Optional[typing.Callable[
+            [Table, int, int, int],
+            typing.Hashable
+        ]] = kwargs.get('getclass')
+
+Glyph = typing.Tuple[typing.Tuple[str, ...], typing.Tuple[str, ...]]
+
+class LayoutAttribute:
+    """A Table attribute that discards the table's cached layout when it is set."""
+
+    def __init__(self):
+        self.attr_name: str = ''
+
+    def __set_name__(self, owner, name):
+        self.attr_name = '_' + name
+
+    def __get__(self, obj, objtype=None):
+        if obj is None:
+            return self
+        return getattr(obj, self.attr_name)
+
+    def __set__(self, obj, value):
+        setattr(obj, self.attr_name, value)
+        obj._layout = None # pylint: disable=protected-access
+
+class TableLayout:
+    """Widths and padding strings of a table, computed once instead of for every drawn line."""
+
+    def __init__(self, tbl: 'Table'):
+        self.col_count: int = tbl.col_count()
+        self.row_cell_length: int = tbl.row_cell_length()
+        self.has_labels: bool = tbl.has_labels()
+        self.longest_label_length: int = tbl._get_longest_label_length() # pylint: disable=protected-access
+        self.max_length: int = tbl.compute_max_length(self.longest_label_length)
+
+        self.label_left: bool = tbl.label_left
+        self.label_lpad: bool = tbl.label_lpad
+        self.label_sep: str = tbl.label_sep
+
+        self.blank: str = ' ' * self.max_length
+        self.row_padding: str = ' ' * (self.max_length - self.row_cell_length)
+
+        if self.label_left:
+            self.label_width: int = self.longest_label_length
+            self.padding_after: str = ' ' * (
+                self.max_length - self.longest_label_length - len(self.label_sep)
+                - self.row_cell_length
+            )
+        else:
+            self.label_width = self.max_length - self.row_cell_length - len(self.label_sep)
+            self.padding_after = ''
+
+        self.blank_label: str = self.pad_label('')
+
+        # drawn cell lines by cell class, as (lines, lines without the left border)
+        self.glyphs: typing.Dict[typing.Hashable, Glyph] = {}
+
+    def pad_label(self, label: str) -> str:
+        padding = ' ' * (self.label_width - len(label))
+        label = padding + label if self.label_lpad else label + padding
+
+        if self.label_left:
+            return label + self.label_sep
+        return self.label_sep + label
+
 class Table:
+    data = LayoutAttribute()
+    cell_info = LayoutAttribute()
+    table_name = LayoutAttribute()
+    label_sep = LayoutAttribute()
+    label_lpad = LayoutAttribute()
+    label_left = LayoutAttribute()
+    row_labels = LayoutAttribute()
+    config = LayoutAttribute()
+
     def __init__(self, cell_info: CellInfo):
-        self.data: typing.List[typing.List[int]] = [[]]
+        self._layout: typing.Optional[TableLayout] = None
+
+        self.data: typing.Union[typing.List[typing.List[int]], SparseGrid] = [[]]
         self.cell_info: CellInfo = cell_info
 
         self.table_name: typing.Optional[str] = None
@@ -28,31 +107,22 @@ class Table:
         self.label_lpad: bool = False
         self.label_left: bool = False
 
-        self._row_labels: typing.Union[
+        self.row_labels: typing.Union[
             typing.List[str],
             typing.Dict[int, str]
         ] = {}
-        self._longest_label_length: int = 0
 
         self.config: TableConfig = TableConfig()
 
     @property
-    def row_labels(self):
-        return self._row_labels
-
-    @row_labels.setter
-    def row_labels(self,
-            value: typing.Union[
-                typing.List[str],
-                typing.Dict[int, str]
-            ]
-        ):
-        self._row_labels = value
-        self._longest_label_length = self._get_longest_label_length()
+    def layout(self) -> TableLayout:
+        if self._layout is None:
+            self._layout = TableLayout(self)
+        return self._layout
 
     @property
     def longest_label_length(self):
-        return self._longest_label_length
+        return self.layout.longest_label_length
 
     def draw_table(self) -> str:
         return Table.draw_tables([self])
@@ -68,78 +138,70 @@ class Table:
         return '\n'.join(self.draw_row_iter(row, row_idx))
 
     def draw_row_iter(self, row: typing.List[int], row_idx: int = -1):
-        gen_list = [ self.draw_cell_iter(row[i], col=i, row=row_idx) for i in range(len(row)) ]
-        if len(gen_list) == 0:
+        glyphs = self.row_glyphs(row, row_idx)
+        if len(glyphs) == 0:
             return
 
-        has_labels = self.has_labels()
+        layout = self.layout
+        has_border = self.cell_info.has_border
+        do_labels = row_idx != -1 and layout.has_labels
         did_label = False
         first_line = True
 
-        for _ in range(self.cell_info.height):
-            chars = ''
-            first_col = True
+        first_cell = glyphs[0][0]
+        rest_cells = [ glyph[1] for glyph in glyphs[1:] ]
 
-            for gen in gen_list:
-                res = next(gen)
-                if not first_col and self.cell_info.has_border:
-                    chars += res[1:]
-                else:
-                    chars += res
+        for line in range(self.cell_info.height):
+            chars = first_cell[line] + ''.join([ cell[line] for cell in rest_cells ])
 
-                first_col = False
-
-            if row_idx != -1 and has_labels:
+            if do_labels:
                 label = self.get_row_label(row_idx) if not did_label else ''
 
-                if not did_label and self.cell_info.has_border and first_line:
+                if not did_label and has_border and first_line:
                     label = ''
                     did_label = False
                 else:
                     did_label = True
 
-                if label is None:
-                    label = ''
-
-                if self.label_left:
-                    padding = ' ' * (self.longest_label_length - len(label))
-                    padding_after = ' ' * (
-                        self.max_length() - self.longest_label_length - len(self.label_sep) - self.row_cell_length()
-                    )
+                label = layout.pad_label(label) if label else layout.blank_label
 
-                    if self.label_lpad:
-                        label = padding + label
-                    else:
-                        label += padding
-
-                    chars = '%s%s%s%s' % (label, self.label_sep, chars, padding_after)
+                if layout.label_left:
+                    chars = label + chars + layout.padding_after
                 else:
-                    padding = ' ' * (
-                        self.max_length() - self.row_cell_length() - len(self.label_sep) - len(label)
-                    )
-
-                    if self.label_lpad:
-                        label = padding + label
-                    else:
-                        label += padding
-
-                    chars += self.label_sep + label
+                    chars += label
             else:
-                chars += ' ' * (self.max_length() - self.row_cell_length())
+                chars += layout.row_padding
 
             yield chars
             first_line = False
 
-    def draw_cell_iter(self, val: int, col: int = -1, row: int = -1) -> typing.Generator[str, None, None]:
-        for res in self.cell_info.fnc_draw_cell(
-            self.cell_info.fnc_getval(
-                self,
-                val,
-                col=col,
-                row=row
-            )
-        ):
-            yield res
+    def row_glyphs(self, row: typing.List[int], row_idx: int = -1) -> typing.List[Glyph]:
+        glyphs = self.layout.glyphs
+        fnc_getclass = self.cell_info.fnc_getclass
+        result = []
+
+        for col, val in enumerate(row):
+            if fnc_getclass is not None:
+                key = fnc_getclass(self, val, col, row_idx)
+                glyph = glyphs.get(key)
+                if glyph is None:
+                    cell_val = self.cell_info.fnc_getval(self, val, col=col, row=row_idx)
+                    glyph = self.draw_glyph(cell_val)
+                    glyphs[key] = glyph
+            else:
+                key = self.cell_info.fnc_getval(self, val, col=col, row=row_idx)
+                glyph = glyphs.get(key)
+                if glyph is None:
+                    glyph = self.draw_glyph(key)
+                    glyphs[key] = glyph
+            result.append(glyph)
+        return result
+
+    def draw_glyph(self, cell_val: str) -> Glyph:
+        lines = tuple(self.cell_info.fnc_draw_cell(cell_val))
+        if self.cell_info.has_border:
+            return lines, tuple(map(lambda x: x[1:], lines))
+        return lines, lines
 
     def get_row_label(self, row_idx: int) -> typing.Optional[str]:
         if isinstance(self.row_labels, dict):
@@ -150,7 +212,21 @@ class Table:
         return self.row_labels[row_idx]
 
     def max_length(self, include_table_name: bool = True, include_label: bool = True) -> int:
-        length = self.row_cell_length()
+        if include_table_name and include_label:
+            return self.layout.max_length
+        return self.compute_max_length(
+            self.longest_label_length,
+            include_table_name=include_table_name,
+            include_label=include_label
+        )
+
+    def compute_max_length(self,
+        longest_label_length: int,
+        include_table_name: bool = True,
+        include_label: bool = True
+    ) -> int:
+        row_cell_length = self.row_cell_length()
+        length = row_cell_length
         name_longer = include_table_name and self.table_name is not None and len(self.table_name) > length
 
         if name_longer:
@@ -158,14 +234,14 @@ class Table:
 
         if include_label and self.has_labels():
             if self.label_left:
-                length += len(self.label_sep) + self.longest_label_length
+                length += len(self.label_sep) + longest_label_length
             else:
                 if name_longer:
-                    diff = self.row_cell_length() + len(self.label_sep) + self.longest_label_length - length
+                    diff = row_cell_length + len(self.label_sep) + longest_label_length - length
                     if diff > 0:
                         length += diff
                 else:
-                    length += len(self.label_sep) + self.longest_label_length
+                    length += len(self.label_sep) + longest_label_length
         return length
 
     def _get_longest_label_length(self) -> int:
@@ -198,16 +274,35 @@ class Table:
 
     @staticmethod
     def draw_tables(tablelist: typing.List['Table'], **kwargs) -> str:
+        lines = Table.draw_tables_lines(tablelist, **kwargs)
+        if len(lines) == 0:
+            return ''
+        return '\n'.join(lines) + '\n'
+
+    @staticmethod
+    def draw_tables_lines(tablelist: typing.List['Table'], **kwargs) -> typing.List[str]:
+        return list(Table.draw_tables_iter(tablelist, **kwargs))
+
+    @staticmethod
+    def draw_tables_iter(
+        tablelist: typing.List['Table'],
+        **kwargs
+    ) -> typing.Generator[str, None, None]:
+        """Yields the lines of the tables drawn side by side, as each line is finished.
+
+        The line of table names is only yielded with the first row, so tables with no rows draw
+        nothing.
+        """
         tbl_count = len(tablelist)
         spacing = kwargs.get('spacing', 2)
+        spacer = ' ' * spacing
         row_counter = [ 0 ] * tbl_count
         lne_counter = [ 0 ] * tbl_count
-        result = ''
-        last_result_len = 0
 
         gen_list = []
         gen_done: typing.Set[int] = set()
         has_table_name = False
+        name_line = None
 
         for tbl in tablelist:
             gen_list.append(tbl.draw_table_iter())
@@ -215,12 +310,11 @@ class Table:
                 has_table_name = True
 
         if has_table_name:
+            parts = []
             for idx in range(tbl_count):
                 tbl = tablelist[idx]
                 if tbl.table_name is None:
-                    result += ' ' * tbl.max_length()
-                    if idx != tbl_count - 1:
-                        result += ' ' * spacing
+                    parts.append(tbl.layout.blank)
                     continue
 
                 name = ''
@@ -228,14 +322,12 @@ class Table:
                     name += ' ' * (tbl.longest_label_length + len(tbl.label_sep))
                 name += tbl.table_name
                 name += ' ' * (tbl.max_length() - len(name))
-
-                result += name
-                if idx != tbl_count - 1:
-                    result += ' ' * spacing
-            result += '\n'
+                parts.append(name)
+            name_line = spacer.join(parts)
 
         while len(gen_done) != tbl_count:
             draws_done = 0
+            parts = []
 
             for gidx in range(tbl_count): # pylint: disable=consider-using-enumerate
                 gen = gen_list[gidx]
@@ -260,18 +352,13 @@ class Table:
                         break
 
                 if do_draw:
-                    result += res
+                    parts.append(res)
                     draws_done += 1
                 else:
-                    result += ' ' * tbl.max_length()
-
-                if gidx != tbl_count - 1:
-                    result += ' ' * spacing
+                    parts.append(tbl.layout.blank)
 
-            if draws_done == 0:
-                result = result[:last_result_len]
-            else:
-                result += '\n'
-            last_result_len = len(result)
-
-        return result
+            if draws_done != 0:
+                if name_line is not None:
+                    yield name_line
+                    name_line = None
+                yield spacer.join(parts)
@@ -2,24 +2,65 @@ from datetime import datetime, timedelta
 import typing
 
 class TableConfig:
+    """Options of one table, with the same defaults as the command line options."""
+
     def __init__(self, **kwargs):
-        self.tbl_name: str = kwargs.get('tbl_name')
-        self.color: bool = kwargs.get('color')
-        self.border = kwargs.get('border')
-        self.col: int = kwargs.get('col')
-        self.delta: timedelta = kwargs.get('delta')
-        self.filter_names: typing.List[str] = kwargs.get('filter_names')
-        self.start: datetime = kwargs.get('start')
-        self.end: datetime = kwargs.get('end')
-
-        self.collapse: int = kwargs.get('collapse')
-        self.collapse_flag: int = kwargs.get('collapse_flag')
-
-        self.label_left: bool = kwargs.get('label_left')
-        self.label_sep: str = kwargs.get('label_sep')
-        self.label: bool = kwargs.get('label')
-        self.label_inclusive: bool = kwargs.get('label_inclusive')
-        self.long_label: bool = kwargs.get('long_label')
-
-        self.threshold: int = kwargs.get('threshold')
-        self.num: bool = kwargs.get('num')
+        self.tbl_name: typing.Optional[str] = kwargs.get('tbl_name')
+        self.color: bool = kwargs.get('color', True)
+        self.border: bool = kwargs.get('border', False)
+        self.delta: timedelta = kwargs.get('delta') or timedelta(days=1)
+        self.filter_names: typing.Optional[typing.List[str]] = kwargs.get('filter_names')
+        self.start: typing.Optional[datetime] = kwargs.get('start')
+        self.end: typing.Optional[datetime] = kwargs.get('end')
+
+        # guessed from the delta if not given
+        col: typing.Optional[int] = kwargs.get('col')
+        if col is None:
+            col = guess_col_count(self.delta)
+        self.col: int = col if col is not None else 10
+
+        self.collapse: int = kwargs.get('collapse', -1)
+        self.collapse_flag: int = kwargs.get('collapse_flag', 0)
+
+        self.label_left: bool = kwargs.get('label_left', True)
+        self.label_sep: str = kwargs.get('label_sep', ' ' * 2)
+        self.label: bool = kwargs.get('label', True)
+        self.label_inclusive: bool = kwargs.get('label_inclusive', True)
+        self.long_label: bool = kwargs.get('long_label', True)
+
+        self.threshold: int = kwargs.get('threshold', 0)
+        self.num: bool = kwargs.get('num', False)
+
+def guess_col_count(delta: timedelta, min_col: int = 4, max_col: int = 12):
+    timeframes = [
+        60, # 1 minute
+        3600, # 1 hour
+        6 * 3600, # 6 hours
+        86400, # 1 day
+        7 * 86400, # 1 week
+        14 * 86400, # 2 weeks
+    ]
+
+    seconds = delta.days * 86400 + delta.seconds
+    idx = 0
+
+    for i in range(len(timeframes)):
+        idx = i
+        if seconds < timeframes[idx]:
+            break
+
+    count = timeframes[idx] // seconds
+    checked = set()
+
+    while count < min_col or count > max_col:
+        if count < min_col:
+            idx += 1
+        else:
+            idx -= 1
+
+        if idx == -1 or idx == len(timeframes) or idx in checked:
+            return None
+
+        count = timeframes[idx] // seconds
+        checked.add(idx)
+    return count
@@ -0,0 +1,166 @@
+"""Redraws the tables in the terminal whenever new commits are made."""
+
+from argparse import Namespace
+import contextlib
+from datetime import datetime
+import io
+import time
+import typing
+
+from . import args, gitcal
+from .bucket import from_timestamp
+from .commitsource import CommitSource
+from .history import RepoHistory
+from .table import Table
+from .tableconfig import TableConfig
+
+CLEAR_SCREEN = '\x1b[H\x1b[2J'
+CLEAR_TO_LINE_END = '\x1b[K'
+CLEAR_TO_SCREEN_END = '\x1b[J'
+HIDE_CURSOR = '\x1b[?25l'
+SHOW_CURSOR = '\x1b[?25h'
+
+class WatchedCommitSource(CommitSource):
+    """The commits of repository histories that keep growing while they are watched."""
+
+    def __init__(self, histories: typing.List[RepoHistory], **kwargs):
+        super().__init__(**kwargs)
+        self.histories: typing.List[RepoHistory] = histories
+
+        # --all-users tables get no implicit end, so commits made later are still counted
+        self.open_ended: bool = kwargs.get('open_ended', True)
+
+    @property
+    def users(self) -> typing.Set[str]:
+        users: typing.Set[str] = set()
+        for history in self.histories:
+            users.update(history.commits.users())
+        return users
+
+    def last_date(self) -> typing.Optional[datetime]:
+        if self.open_ended:
+            return None
+        histories = filter(lambda x: len(x.commits) != 0, self.histories)
+        times = [ history.commits.times[-1] for history in histories ]
+        return from_timestamp(max(times)) if len(times) != 0 else None
+
+class TableWatcher:
+    """Keeps the bucket counts of the tables up to date with the repositories.
+
+    New commits are counted into the existing counters and the tables are rebuilt from the
+    counters, so the history is only read from git in full if it was rewritten. The tables are
+    made from the arguments again when new authors commit, so --all-users shows them too.
+    """
+
+    def __init__(self, argv: typing.List[str], histories: typing.List[RepoHistory]):
+        self.argv: typing.List[str] = argv
+        self.histories: typing.List[RepoHistory] = histories
+
+        self.argspace: typing.Optional[Namespace] = None
+        self.users: typing.Set[str] = set()
+        self.plan, self.counters = gitcal.create_plan([])
+
+        # the tables drawn end at the newest commit like on the command line, the counters do not
+        self.drawn_configs: typing.List[TableConfig] = []
+
+    def update(self) -> bool:
+        """Counts the commits made since the last update.
+
+        Returns whether HEAD moved in any repository.
+        """
+        updates = [ history.update() for history in self.histories ]
+        if all(map(lambda x: x is None, updates)):
+            return False
+
+        new_users: typing.Set[str] = set()
+        for update in updates:
+            if update is not None:
+                new_users.update(update[0].users())
+
+        if self.argspace is None \
+            or any(map(lambda x: x is not None and not x[1], updates)) \
+            or not new_users <= self.users:
+            # commits cannot be taken back out of the counters, so every commit is counted again
+            self.make_tables()
+            for history in self.histories:
+                self.plan.add_sorted_times(history.commits.times, history.commits.author_index())
+        else:
+            for update in updates:
+                if update is not None:
+                    commits, _ = update
+                    self.plan.add_sorted_times(commits.times, commits.author_index())
+
+        self.plan.finish()
+        drawn_source = WatchedCommitSource(self.histories, open_ended=False)
+        _, self.drawn_configs = self.parse_tables(drawn_source)
+        return True
+
+    def make_tables(self) -> None:
+        commit_source = WatchedCommitSource(self.histories)
+        self.users = commit_source.users
+        self.argspace, table_configs = self.parse_tables(commit_source)
+        self.plan, self.counters = gitcal.create_plan(table_configs)
+
+    def parse_tables(
+        self,
+        commit_source: CommitSource
+    ) -> typing.Tuple[Namespace, typing.List[TableConfig]]:
+        # warnings are only written the first time, later they would break up the tables on screen
+        quiet = self.argspace is not None
+        with contextlib.redirect_stderr(io.StringIO()) if quiet else contextlib.suppress():
+            argspace, table_configs = args.parse_table_configs(self.argv, commit_source)
+            args.append_table_config(argspace, table_configs, commit_source)
+        return argspace, table_configs
+
+    def tables(self) -> typing.List[Table]:
+        tablelist = gitcal.create_tables_from_counters(self.drawn_configs, self.counters)
+        gitcal.do_collapses(tablelist)
+        return tablelist
+
+def redraw_lines(
+    file: typing.TextIO,
+    old_lines: typing.List[str],
+    new_lines: typing.List[str]
+) -> None:
+    """Rewrites only the lines on the screen that changed, moving the cursor to each of them."""
+    output = []
+    for idx, line in enumerate(new_lines):
+        if idx >= len(old_lines) or line != old_lines[idx]:
+            output.append('\x1b[%d;1H%s%s' % (idx + 1, line, CLEAR_TO_LINE_END))
+    if len(new_lines) < len(old_lines):
+        output.append('\x1b[%d;1H%s' % (len(new_lines) + 1, CLEAR_TO_SCREEN_END))
+
+    file.write(''.join(output))
+    file.flush()
+
+def watch(
+    argv: typing.List[str],
+    commit_source: CommitSource,
+    file: typing.TextIO,
+    interval: float = 2.0
+) -> None:
+    """Draws the tables, then checks the repositories for new commits every interval seconds and
+    redraws the lines that changed. Runs until interrupted.
+
+    The commit source only gives the repositories to watch and how to read them, their history is
+    read by the watcher.
+    """
+    backend = commit_source.get_backend(need_names=True)
+    repos: typing.List[typing.Optional[str]] = list(commit_source.repos)
+    if len(repos) == 0:
+        repos.append(None)
+    watcher = TableWatcher(argv, [ RepoHistory(repo, backend) for repo in repos ])
+
+    lines: typing.List[str] = []
+    file.write(HIDE_CURSOR + CLEAR_SCREEN)
+    try:
+        while True:
+            if watcher.update():
+                spacing = watcher.argspace.spacing
+                new_lines = Table.draw_tables_lines(watcher.tables(), spacing=spacing)
+                redraw_lines(file, lines, new_lines)
+                lines = new_lines
+            time.sleep(interval)
+    finally:
+        file.write('\x1b[%d;1H%s' % (len(lines) + 1, SHOW_CURSOR))
+        file.flush()
@@ -0,0 +1,65 @@
+import io
+import unittest.mock as mock
+
+
+class MockPopen:
+    def __init__(self, args, data):
+        self.args = args
+        self.stdout = io.BytesIO(data)
+        self.returncode = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.wait()
+
+    def communicate(self, input=None, timeout=None):
+        data = self.stdout.read()
+        self.wait()
+        return data, None
+
+    def poll(self):
+        return self.returncode
+
+    def wait(self, timeout=None):
+        self.stdout.close()
+        self.returncode = 0
+        return self.returncode
+
+def format_log(data, args):
+    """Renders log data stored as '%h %at %ad %an' lines in the format requested by args.
+
+    Committer dates are the same as the author dates, shown in UTC as the local time.
+    """
+    fmt = None
+    for arg in args:
+        for prefix in ['--pretty=format:', '--format=']:
+            if arg.startswith(prefix):
+                fmt = arg[len(prefix):]
+    if fmt is None or fmt == '%h %at %ad %an':
+        return data
+
+    lines = []
+    for line in data.split(b'\n'):
+        if len(line.strip()) == 0:
+            continue
+        shorthash, timestamp, offset, name = line.decode('utf-8').split(' ', 3)
+        lines.append(
+            fmt.replace('%h', shorthash)
+                .replace('%at', timestamp)
+                .replace('%ad', offset)
+                .replace('%an', name)
+                .replace('%ct', timestamp)
+                .replace('%cd', '+0000')
+        )
+    return '\n'.join(lines).encode('utf-8')
+
+def mock_git_output(fname, calls=None):
+    def popen(args, **kwargs):
+        if calls is not None:
+            calls.append(args)
+        with open(fname, 'rb') as file:
+            return MockPopen(args, format_log(file.read(), args))
+
+    return mock.patch('subprocess.Popen', popen)
@@ -0,0 +1,182 @@
+from array import array
+import datetime
+import os
+import random
+import unittest
+import unittest.mock as mock
+
+from src.gitcal import bucket, gitcommit
+from src.gitcal.bucket import BucketCounter, BucketPlan, Rollup
+from src.gitcal.gitcal import draw_cell_unborder
+
+
+LOG_DIR = os.path.join(os.path.dirname(__file__), 'mocked_data')
+
+NUMPY_TABLES = [
+    {},
+    {'delta': datetime.timedelta(hours=1), 'col_count': 6},
+    {'delta': datetime.timedelta(hours=9), 'col_count': 4},
+    {'delta': datetime.timedelta(minutes=30), 'col_count': 12},
+    {'delta': datetime.timedelta(days=2), 'col_count': 5, 'labels_inclusive': False},
+    {'filter_names': ['jsmith', 'John Smith']},
+    {'filter_names': ['does not exist']},
+    {'start_date': datetime.datetime(2020, 12, 1), 'end_date': datetime.datetime(2021, 2, 1, 12)},
+    {'start_date': datetime.datetime(2021, 3, 20, 1, 23, 45), 'filter_names': ['user1']},
+    {'end_date': datetime.datetime(2021, 6, 1)},
+    {'start_date': datetime.datetime(2030, 1, 1)},
+]
+
+
+def mkdtime(string):
+    return datetime.datetime.strptime(string, '%Y-%m-%d %H:%M:%S')
+
+def mktime(string):
+    return bucket.to_timestamp(mkdtime(string))
+
+
+class BucketTest(unittest.TestCase):
+    def test_timestamp_roundtrip(self):
+        for string in ['1970-01-01 00:00:00', '2021-03-23 10:24:12', '1969-07-20 20:17:40']:
+            self.assertEqual(bucket.from_timestamp(mktime(string)), mkdtime(string))
+
+    def test_resolution(self):
+        self.assertEqual(BucketCounter(datetime.timedelta(days=1)).resolution, 86400)
+        self.assertEqual(BucketCounter(datetime.timedelta(days=2)).resolution, 86400)
+        self.assertEqual(BucketCounter(datetime.timedelta(hours=9)).resolution, 10800)
+        self.assertEqual(BucketCounter(datetime.timedelta(minutes=30)).resolution, 1800)
+
+    def test_bucket_boundaries(self):
+        counter = BucketCounter(datetime.timedelta(hours=1))
+        for string in [
+            '2021-03-23 00:00:00',
+            '2021-03-23 00:30:00',
+            '2021-03-23 01:00:00',
+            '2021-03-23 01:00:01',
+            '2021-03-23 05:59:59',
+        ]:
+            counter.add(mktime(string), 'user')
+
+        origin = mktime('2021-03-23 00:00:00')
+        self.assertEqual(counter.bucket_counts(origin), {0: 3, 1: 1, 5: 1})
+
+    def test_filters(self):
+        counter = BucketCounter(
+            datetime.timedelta(days=1),
+            start=mkdtime('2021-03-02 00:00:00'),
+            end=mkdtime('2021-03-04 00:00:00'),
+            filter_names=['a', 'b'],
+        )
+        counter.add(mktime('2021-03-01 12:00:00'), 'a')
+        counter.add(mktime('2021-03-02 12:00:00'), 'c')
+        counter.add(mktime('2021-03-03 12:00:00'), 'a')
+        counter.add(mktime('2021-03-03 13:00:00'), 'b')
+        counter.add(mktime('2021-03-05 12:00:00'), 'b')
+
+        self.assertEqual(counter.first_time, mktime('2021-03-01 12:00:00'))
+        self.assertEqual(counter.first_time_after_start, mktime('2021-03-02 12:00:00'))
+        self.assertEqual(sum(counter.counts.values()), 2)
+
+    def test_plan_shares_counters(self):
+        plan = BucketPlan()
+        first = plan.counter(datetime.timedelta(days=1), filter_names=['a', 'b'])
+        second = plan.counter(datetime.timedelta(days=1), filter_names=['b', 'a'])
+        third = plan.counter(datetime.timedelta(days=1), filter_names=['a'])
+        fourth = plan.counter(datetime.timedelta(days=1))
+
+        self.assertIs(first, second)
+        self.assertIsNot(first, third)
+        self.assertIsNot(first, fourth)
+        self.assertEqual(len(plan.counters), 3)
+
+    def test_plan_matches_counters(self):
+        with open(os.path.join(LOG_DIR, 'git-log-multi-t.txt'), 'rb') as file:
+            records = list(gitcommit.iter_parse_commit_records(file.read().split(b'\n')))
+
+        plan = BucketPlan()
+        pairs = []
+        for kwargs in [
+            {},
+            {'filter_names': ['jsmith', 'John Smith']},
+            {'filter_names': ['user1'], 'start': mkdtime('2021-01-01 00:00:00')},
+            {'start': mkdtime('2020-12-01 00:00:00'), 'end': mkdtime('2021-02-01 12:00:00')},
+        ]:
+            counter = BucketCounter(datetime.timedelta(hours=4), **kwargs)
+            for _, timestamp, author_name in records:
+                counter.add(timestamp, author_name)
+            pairs.append((counter, plan.counter(datetime.timedelta(hours=4), **kwargs)))
+
+        for _, timestamp, author_name in records:
+            plan.add(timestamp, author_name)
+        plan.finish()
+
+        for expected, result in pairs:
+            self.assertEqual(result.counts, expected.counts)
+            self.assertEqual(result.first_time, expected.first_time)
+            self.assertEqual(result.first_time_after_start, expected.first_time_after_start)
+
+    def test_rollup_levels(self):
+        times = [ mktime('2021-03-01 00:00:00'), mktime('2021-03-01 00:00:01'), mktime('2021-03-01 00:59:30') ]
+        rollup = Rollup(array('q', times), {'a': array('q', times[1:])})
+
+        self.assertEqual(rollup.level_counts(60), {times[0] // 60 - 1: 1, times[0] // 60: 1, times[2] // 60: 1})
+        self.assertEqual(rollup.level_counts(3600), {times[0] // 3600 - 1: 1, times[0] // 3600: 2})
+        self.assertEqual(rollup.level_counts(86400, 'a'), {times[0] // 86400: 2})
+        self.assertEqual(rollup.level_counts(86400, 'b'), {})
+
+        self.assertEqual(rollup.level_for(900), 60)
+        self.assertEqual(rollup.level_for(21600), 3600)
+        self.assertEqual(rollup.level_for(86400), 86400)
+        self.assertIsNone(rollup.level_for(30))
+
+    def test_rollup_matches_times(self):
+        rand = random.Random(0)
+        first = mktime('2021-01-01 00:00:00')
+        store = gitcommit.CommitStore()
+        for _ in range(3000):
+            store.append(first + rand.randrange(86400 * 60), rand.choice(['a', 'b', 'c']))
+        store.sort()
+
+        for _ in range(50):
+            plans = (BucketPlan(), BucketPlan())
+            pairs = []
+            for _ in range(3):
+                delta = datetime.timedelta(seconds=rand.choice([30, 60, 900, 3600, 3600 * 6, 86400, 86400 * 7]))
+                kwargs = {}
+                if rand.random() < 0.5:
+                    kwargs['filter_names'] = rand.sample(['a', 'b', 'd'], 2)
+                if rand.random() < 0.7:
+                    kwargs['start'] = bucket.from_timestamp(first + rand.randrange(86400 * 30))
+                if rand.random() < 0.7:
+                    kwargs['end'] = bucket.from_timestamp(first + rand.randrange(86400 * 30, 86400 * 61))
+                pairs.append(tuple(map(lambda x: x.counter(delta, **kwargs), plans)))
+
+            plans[0].add_sorted_times(store.times, store.author_index())
+            plans[1].add_rollup(Rollup(store.times, store.author_index()))
+            for plan in plans:
+                plan.finish()
+
+            for expected, result in pairs:
+                self.assertEqual(result.counts, expected.counts)
+                self.assertEqual(result.first_time_after_start, expected.first_time_after_start)
+
+    @unittest.skipIf(bucket.numpy is None, 'numpy is not installed')
+    def test_numpy_matches_python(self):
+        with open(os.path.join(LOG_DIR, 'git-log-multi-t.txt'), 'rb') as file:
+            store = gitcommit.load_commit_store(file.read().split(b'\n'))
+        store.reverse()
+
+        for kwargs in NUMPY_TABLES:
+            with mock.patch('src.gitcal.bucket.numpy', None):
+                expected = gitcommit.create_table_from_commits(cell_info, store, **kwargs)
+            with mock.patch('src.gitcal.bucket.NUMPY_MIN_SIZE', 0):
+                result = gitcommit.create_table_from_commits(cell_info, store, **kwargs)
+
+            self.assertEqual(result.data, expected.data)
+            self.assertEqual(result.row_labels, expected.row_labels)
+
+cell_info = gitcommit.CellInfo(
+    width=2,
+    height=1,
+    has_border=False,
+    drawcell=draw_cell_unborder,
+)
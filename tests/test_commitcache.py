@@ -0,0 +1,121 @@
+import os
+import subprocess
+import tempfile
+import unittest
+import unittest.mock as mock
+
+from src.gitcal import commitcache, gitcommit
+
+
+def git(*args, date=None):
+    env = dict(os.environ)
+    env.update({
+        'GIT_AUTHOR_NAME': 'tester',
+        'GIT_AUTHOR_EMAIL': 'tester@example.com',
+        'GIT_COMMITTER_NAME': 'tester',
+        'GIT_COMMITTER_EMAIL': 'tester@example.com',
+    })
+    if date is not None:
+        env['GIT_AUTHOR_DATE'] = date
+        env['GIT_COMMITTER_DATE'] = date
+    return subprocess.check_output(['git', *args], env=env, stderr=subprocess.DEVNULL)
+
+def commit(message, date):
+    git('commit', '--allow-empty', '-q', '-m', message, date=date)
+
+
+class CommitCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.olddir = os.getcwd()
+        self.tmpdir = tempfile.TemporaryDirectory()
+        os.chdir(self.tmpdir.name)
+
+        git('init', '-q')
+        commit('first', '2021-03-01T10:00:00+0000')
+        commit('second', '2021-03-02T10:00:00+0000')
+
+    def tearDown(self):
+        os.chdir(self.olddir)
+        self.tmpdir.cleanup()
+
+    def get_commit_data(self):
+        with mock.patch('src.gitcal.gitcommit.git_log', wraps=gitcommit.git_log) as git_log:
+            commits = commitcache.get_commit_data()
+        return commits, git_log.call_args_list
+
+    def test_builds_cache(self):
+        commits, calls = self.get_commit_data()
+        self.assertEqual(len(commits), 2)
+        self.assertEqual(len(calls), 1)
+        self.assertTrue(os.path.isfile(os.path.join('.git', commitcache.CACHE_DIRNAME, 'log')))
+        self.assert_matches_git_log(commits)
+
+    def test_reads_cache(self):
+        self.get_commit_data()
+        commits, calls = self.get_commit_data()
+        self.assertEqual(len(commits), 2)
+        self.assertEqual(len(calls), 0)
+
+    def test_incremental_update(self):
+        self.get_commit_data()
+        commit('third', '2021-03-03T10:00:00+0000')
+        commit('fourth', '2021-03-04T10:00:00+0000')
+
+        commits, calls = self.get_commit_data()
+        self.assertEqual(len(calls), 1)
+        self.assertIn('--not', calls[0][0])
+        self.assert_matches_git_log(commits)
+
+    def test_rewritten_history(self):
+        self.get_commit_data()
+        git('reset', '-q', '--hard', 'HEAD~1')
+        commit('replaced', '2021-03-05T10:00:00+0000')
+
+        commits, calls = self.get_commit_data()
+        self.assertEqual(len(calls), 1)
+        self.assertNotIn('--not', calls[0][0])
+        self.assert_matches_git_log(commits)
+
+    def test_invalid_cache(self):
+        self.get_commit_data()
+        with open(os.path.join('.git', commitcache.CACHE_DIRNAME, 'tips'), 'w') as file:
+            file.write('garbage\n')
+
+        commits, calls = self.get_commit_data()
+        self.assertEqual(len(calls), 1)
+        self.assert_matches_git_log(commits)
+
+    def test_rollup(self):
+        rollup = commitcache.update_rollup()
+        self.assertEqual(len(rollup.times), 2)
+        self.assertTrue(os.path.isfile(os.path.join('.git', commitcache.CACHE_DIRNAME, 'rollup')))
+
+        # a saved rollup is used without reading the log
+        with mock.patch('src.gitcal.commitcache.update_cache') as update_cache:
+            saved = commitcache.update_rollup()
+        update_cache.assert_not_called()
+        self.assertEqual(saved.times, rollup.times)
+        self.assertEqual(saved.author_times, rollup.author_times)
+        for level in commitcache.SAVED_ROLLUP_LEVELS:
+            for author_name in [None, 'tester']:
+                self.assertEqual(saved.level_counts(level, author_name), rollup.level_counts(level, author_name))
+
+        commit('third', '2021-03-03T10:00:00+0000')
+        self.assertEqual(len(commitcache.update_rollup().times), 3)
+
+        with open(os.path.join('.git', commitcache.CACHE_DIRNAME, 'rollup'), 'r+b') as file:
+            file.truncate(os.path.getsize(file.name) - 1)
+        with mock.patch('src.gitcal.commitcache.update_cache', wraps=commitcache.update_cache) as update_cache:
+            self.assertEqual(len(commitcache.update_rollup().times), 3)
+        update_cache.assert_called_once()
+
+    def test_author_local_time(self):
+        commit('third', '2021-03-03T23:30:00-0500')
+        commits, _ = self.get_commit_data()
+        self.assertEqual(str(commits[0].datetime), '2021-03-03 23:30:00')
+
+    def assert_matches_git_log(self, commits):
+        self.assertEqual(
+            list(map(lambda x: x.json(), commits)),
+            list(map(lambda x: x.json(), gitcommit.get_commit_data()))
+        )
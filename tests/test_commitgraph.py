@@ -0,0 +1,92 @@
+import datetime
+import os
+import tempfile
+import unittest
+import unittest.mock as mock
+
+from src.gitcal import commitgraph, gitcommit
+from src.gitcal.bucket import BucketPlan
+from src.gitcal.commitsource import CommitSource
+from tests.test_commitcache import git
+
+
+def commit_tree(repo, message, date, *parents):
+    tree = git('-C', repo, 'write-tree').decode('utf-8').strip()
+    args = []
+    for parent in parents:
+        args.extend(['-p', parent])
+    return git('-C', repo, 'commit-tree', tree, '-m', message, *args, date=date).decode('utf-8').strip()
+
+
+class CommitGraphTest(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.repo = os.path.join(self.tmpdir.name, 'repo')
+        git('init', '-q', self.repo)
+
+        # a root, three branches, an octopus merge of them and a commit on top
+        root = commit_tree(self.repo, 'root', '2021-03-01T10:00:00+0000')
+        branches = [
+            commit_tree(self.repo, 'branch %d' % idx, '2021-03-0%dT10:00:00+0200' % (idx + 2), root)
+            for idx in range(3)
+        ]
+        merge = commit_tree(self.repo, 'merge', '2021-03-06T10:00:00-0500', *branches)
+        self.head = commit_tree(self.repo, 'head', '2021-03-07T23:30:00+0000', merge)
+        git('-C', self.repo, 'update-ref', 'refs/heads/master', self.head)
+        git('-C', self.repo, 'symbolic-ref', 'HEAD', 'refs/heads/master')
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def commit_times(self):
+        output = git('-C', self.repo, 'log', '--format=%ct')
+        return sorted(map(int, output.split()))
+
+    def test_no_commit_graph(self):
+        self.assertIsNone(commitgraph.read_commit_times(self.repo))
+
+    def test_commit_graph(self):
+        git('-C', self.repo, 'commit-graph', 'write', '--reachable')
+        self.assertEqual(sorted(commitgraph.read_commit_times(self.repo)), self.commit_times())
+
+        # head resolved from packed refs instead of a loose ref file
+        git('-C', self.repo, 'pack-refs', '--all')
+        self.assertEqual(sorted(commitgraph.read_commit_times(self.repo)), self.commit_times())
+
+    def test_split_commit_graph(self):
+        git('-C', self.repo, 'commit-graph', 'write', '--reachable', '--split')
+        head = commit_tree(self.repo, 'after split', '2021-03-08T10:00:00+0000', self.head)
+        git('-C', self.repo, 'update-ref', 'refs/heads/master', head)
+        git('-C', self.repo, 'commit-graph', 'write', '--reachable', '--split=no-merge')
+
+        with open(os.path.join(self.repo, '.git', 'objects', 'info', 'commit-graphs', 'commit-graph-chain')) as file:
+            self.assertEqual(len(file.read().split()), 2)
+        self.assertEqual(sorted(commitgraph.read_commit_times(self.repo)), self.commit_times())
+
+    def test_stale_commit_graph(self):
+        git('-C', self.repo, 'commit-graph', 'write', '--reachable')
+        head = commit_tree(self.repo, 'after graph', '2021-03-08T10:00:00+0000', self.head)
+        git('-C', self.repo, 'update-ref', 'refs/heads/master', head)
+        self.assertIsNone(commitgraph.read_commit_times(self.repo))
+
+    def test_worktree(self):
+        git('-C', self.repo, 'commit-graph', 'write', '--reachable')
+        worktree = os.path.join(self.tmpdir.name, 'worktree')
+        git('-C', self.repo, 'worktree', 'add', '-q', '--detach', worktree, self.head)
+        self.assertEqual(sorted(commitgraph.read_commit_times(worktree)), self.commit_times())
+
+    def test_commit_source(self):
+        plans = []
+        for write_graph in [False, True]:
+            if write_graph:
+                git('-C', self.repo, 'commit-graph', 'write', '--reachable')
+
+            plan = BucketPlan()
+            counter = plan.counter(datetime.timedelta(hours=1))
+            with mock.patch('src.gitcal.gitcommit.iter_git_log', wraps=gitcommit.iter_git_log) as iter_git_log:
+                CommitSource(repos=[self.repo], committer_date=True).fold(plan)
+            self.assertEqual(iter_git_log.called, not write_graph)
+            plans.append(counter)
+
+        self.assertEqual(plans[0].counts, plans[1].counts)
+        self.assertEqual(plans[0].first_time, plans[1].first_time)
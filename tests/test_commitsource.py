@@ -0,0 +1,134 @@
+import os
+import tempfile
+import unittest
+import unittest.mock as mock
+
+from src.gitcal import args, gitcommit, __main__
+from src.gitcal.commitsource import CommitSource
+from tests.test_commitcache import git
+
+
+def commit(repo, message, date, author):
+    git('-C', repo, 'commit', '--allow-empty', '-q', '-m', message, '--author', '%s <a@example.com>' % author, date=date)
+
+
+class CommitSourceTest(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.repos = []
+        for name in ['first', 'second', 'third']:
+            path = os.path.join(self.tmpdir.name, name)
+            git('init', '-q', path)
+            self.repos.append(path)
+
+        commit(self.repos[0], 'a', '2021-03-01T10:00:00+0000', 'alice')
+        commit(self.repos[0], 'b', '2021-03-04T10:00:00+0000', 'alice')
+        commit(self.repos[1], 'c', '2021-03-02T10:00:00+0000', 'bob')
+        commit(self.repos[1], 'd', '2021-03-03T10:00:00+0000', 'alice')
+        commit(self.repos[2], 'e', '2021-03-05T10:00:00+0000', 'carol')
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_single_repo(self):
+        source = CommitSource(repos=self.repos[:1])
+        self.assertEqual(len(source.commits), 2)
+        self.assertEqual(source.users, {'alice'})
+
+    def test_merges_repos(self):
+        for use_cache in [False, True, True]:
+            source = CommitSource(repos=self.repos, use_cache=use_cache, max_readers=2)
+            self.assertEqual(len(source.commits), 5)
+            self.assertTrue(source.commits.is_sorted)
+            self.assertEqual(source.users, {'alice', 'bob', 'carol'})
+            self.assertEqual(str(source.last_date()), '2021-03-05 10:00:00')
+
+    def test_sharded_log(self):
+        repo = self.repos[2]
+        # a side branch merged back in, with dates out of order
+        for idx, date in enumerate([
+            '2021-03-06T10:00:00+0000',
+            '2021-03-02T10:00:00+0000',
+            '2021-03-07T10:00:00+0000',
+        ]):
+            commit(repo, 'shard %d' % idx, date, 'dave')
+        git('-C', repo, 'checkout', '-q', '-b', 'side', 'HEAD~2')
+        for idx in range(3):
+            commit(repo, 'side %d' % idx, '2021-03-0%dT10:00:00+0000' % (idx + 1), 'erin')
+        git('-C', repo, 'checkout', '-q', '-')
+        git('-C', repo, 'merge', '-q', '--no-ff', '-m', 'merge', 'side', date='2021-03-08T00:00:00+0000')
+        commit(repo, 'last', '2021-03-09T10:00:00+0000', 'dave')
+
+        # the boundaries are only looked up when a commit-graph makes it cheap
+        self.assertEqual(gitcommit.get_shard_ranges(3, cwd=repo), [])
+        git('-C', repo, 'commit-graph', 'write', '--reachable')
+        self.assertEqual(len(gitcommit.get_shard_ranges(3, cwd=repo)), 3)
+
+        expected = sorted(gitcommit.git_log(cwd=repo).split(b'\n'))
+        with mock.patch('os.cpu_count', lambda: 8):
+            for shards in range(1, 12):
+                log = gitcommit.git_log_sharded(shards, cwd=repo)
+                self.assertEqual(sorted(log.split(b'\n')), expected)
+
+            source = CommitSource(repos=[repo], shards=3)
+            self.assertEqual(len(source.commits), len(expected))
+
+        with mock.patch('os.cpu_count', lambda: 1), \
+            mock.patch('src.gitcal.gitcommit.get_shard_ranges', wraps=gitcommit.get_shard_ranges) as ranges:
+            gitcommit.git_log_sharded(4, cwd=repo)
+        self.assertEqual(ranges.call_args[0][0], 1)
+
+    def test_cached_rollup(self):
+        repo = self.repos[1]
+        commit(repo, 'f', '2021-03-02T10:30:00+0000', 'bob')
+        commit(repo, 'g', '2021-03-02T23:59:59-0700', 'carol')
+        for argv in [
+            [],
+            ['-d', '15m', '--start', '2021-03-02 10:15:00'],
+            ['-d', '6h', '-f', 'bob', '--end', '2021-03-02 10:29:59'],
+            ['-d', '1d', '--start', '2021-03-02 10:00:01', '-T', '-d', '1h', '-f', 'carol'],
+        ]:
+            expected = __main__.draw_tables_from_args(['--repo', repo, *argv])
+            for _ in range(2):
+                self.assertEqual(__main__.draw_tables_from_args(['--repo', repo, '--cache', *argv]), expected)
+
+    def test_repo_args(self):
+        list_path = os.path.join(self.tmpdir.name, 'repos.txt')
+        with open(list_path, 'w') as file:
+            file.write('# repositories\nsecond\n\nthird\n')
+
+        source = CommitSource()
+        argspace, _ = args.parse_args(['--repo', self.repos[0], '--repos-from', list_path], source)
+        self.assertEqual(argspace.repo, self.repos)
+        self.assertEqual(source.repos, self.repos)
+        self.assertEqual(source.users, {'alice', 'bob', 'carol'})
+
+        args.parse_args(['--shards', '4'], source)
+        self.assertEqual(source.shards, 4)
+        with self.assertRaises(SystemExit):
+            args.parse_args(['--shards', '0'], source)
+
+    def test_source_args_after_tables(self):
+        olddir = os.getcwd()
+        os.chdir(self.repos[0])
+        try:
+            source = CommitSource()
+            argspace, table_configs = args.parse_args(
+                ['--all-users', '-T', '--repo', self.repos[1], '--committer-date', '--cache'],
+                source
+            )
+            args.append_table_config(argspace, table_configs, source)
+        finally:
+            os.chdir(olddir)
+
+        # the users come from the repository given after -T, not the current directory
+        self.assertEqual(source.repos, self.repos[1:2])
+        self.assertTrue(source.committer_date)
+        self.assertTrue(source.use_cache)
+        self.assertEqual(list(map(lambda x: x.tbl_name, table_configs)), ['alice', 'bob', None])
+
+    def test_repo_args_missing(self):
+        with self.assertRaises(SystemExit):
+            args.parse_args(['--repo', os.path.join(self.tmpdir.name, 'missing')], CommitSource())
+        with self.assertRaises(SystemExit):
+            args.parse_args(['--repos-from', os.path.join(self.tmpdir.name, 'missing.txt')], CommitSource())
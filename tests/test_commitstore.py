@@ -0,0 +1,144 @@
+import datetime
+import os
+import unittest
+
+from src.gitcal import gitcommit
+from src.gitcal.commitstore import CommitStore
+from src.gitcal.gitcal import draw_cell_unborder
+
+
+LOG_DIR = os.path.join(os.path.dirname(__file__), 'mocked_data')
+
+
+def load_commits(name):
+    with open(os.path.join(LOG_DIR, name), 'rb') as file:
+        commits = gitcommit.parse_commit_data(file.read())
+    commits.reverse()
+    return commits
+
+
+class CommitStoreTest(unittest.TestCase):
+    def test_from_commits(self):
+        commits = load_commits('git-log-multi.txt')
+        store = CommitStore.from_commits(commits, keep_hashes=True)
+
+        self.assertEqual(len(store), len(commits))
+        self.assertEqual(len(store.authors), 2)
+        self.assertEqual(
+            list(map(lambda x: x.json(), store)),
+            list(map(lambda x: x.json(), commits))
+        )
+        self.assertEqual(store[-1].json(), commits[-1].json())
+
+        with self.assertRaises(IndexError):
+            store[len(commits)] # pylint: disable=pointless-statement
+
+    def test_without_hashes(self):
+        commits = load_commits('git-log.txt')
+        store = CommitStore.from_commits(commits)
+
+        self.assertIsNone(store.hashes)
+        self.assertEqual(store[0].shorthash, '')
+        self.assertEqual(store[0].datetime, commits[0].datetime)
+        self.assertEqual(store[0].author_name, commits[0].author_name)
+
+    def test_slice(self):
+        commits = load_commits('git-log-multi.txt')
+        store = CommitStore.from_commits(commits, keep_hashes=True)
+
+        part = store[10:20]
+        self.assertIsInstance(part, CommitStore)
+        self.assertEqual(
+            list(map(lambda x: x.json(), part)),
+            list(map(lambda x: x.json(), commits[10:20]))
+        )
+        self.assertEqual(
+            part.users(),
+            gitcommit.get_users_from_commits(commits[10:20])
+        )
+
+    def test_copy(self):
+        commits = load_commits('git-log-multi.txt')
+        store = CommitStore.from_commits(commits)
+        users = store.users()
+
+        copy = store.copy()
+        copy.append(commits[0].timestamp - 1, 'someone new')
+        self.assertEqual(len(copy), len(store) + 1)
+        self.assertFalse(copy.is_sorted)
+        self.assertTrue(store.is_sorted)
+        self.assertEqual(store.users(), users)
+        self.assertEqual(copy.users(), users | {'someone new'})
+
+    def test_users(self):
+        commits = load_commits('git-log-multi-t.txt')
+        store = CommitStore.from_commits(commits)
+        self.assertEqual(
+            gitcommit.get_users_from_commits(store),
+            gitcommit.get_users_from_commits(commits)
+        )
+
+    def test_author_index(self):
+        commits = load_commits('git-log-multi-t.txt')
+        store = CommitStore.from_commits(commits)
+        index = store.author_index()
+
+        self.assertEqual(set(index), gitcommit.get_users_from_commits(commits))
+        for name, times in index.items():
+            self.assertEqual(
+                list(times),
+                sorted(map(lambda x: x.timestamp, filter(lambda x: x.author_name == name, commits)))
+            )
+
+        self.assertIs(store.author_index(), index)
+        store.append(0, 'new user')
+        self.assertIn('new user', store.author_index())
+
+    def test_sort(self):
+        commits = load_commits('git-log-multi-t.txt')
+        store = CommitStore.from_commits(commits, keep_hashes=True)
+        self.assertFalse(store.is_sorted)
+
+        store.sort()
+        self.assertTrue(store.is_sorted)
+        self.assertEqual(
+            list(map(lambda x: x.json(), store)),
+            list(map(lambda x: x.json(), sorted(commits, key=lambda x: x.timestamp)))
+        )
+
+    def test_window(self):
+        commits = sorted(load_commits('git-log-multi-t.txt'), key=lambda x: x.timestamp)
+        store = CommitStore.from_commits(commits)
+
+        start = commits[100].timestamp
+        end = commits[200].timestamp
+        self.assertEqual(store.window(start, end), (100, 201))
+        self.assertEqual(store.window(None, end), (0, 201))
+        self.assertEqual(store.window(start, None), (100, len(commits)))
+        self.assertEqual(store.window(end, start), (200, 200))
+        self.assertEqual(store.window(commits[-1].timestamp + 1, None), (len(commits), len(commits)))
+
+        low, high = store.window(start, end)
+        self.assertTrue(all(map(lambda x: start <= x.timestamp <= end, store[low:high])))
+
+    def test_create_table(self):
+        commits = load_commits('git-log-multi-t.txt')
+        store = CommitStore.from_commits(commits)
+
+        for kwargs in [
+            {},
+            {'delta': datetime.timedelta(hours=4), 'col_count': 6},
+            {'filter_names': ['jsmith', 'John Smith']},
+            {'start_date': datetime.datetime(2021, 1, 1), 'end_date': datetime.datetime(2021, 2, 1)},
+        ]:
+            expected = gitcommit.create_table_from_commits(cell_info, commits, **kwargs)
+            result = gitcommit.create_table_from_commits(cell_info, store, **kwargs)
+            self.assertEqual(result.data, expected.data)
+            self.assertEqual(result.row_labels, expected.row_labels)
+
+cell_info = gitcommit.CellInfo(
+    width=2,
+    height=1,
+    has_border=False,
+    drawcell=draw_cell_unborder,
+)
@@ -1,8 +1,20 @@
+from array import array
+import datetime
+import io
+import itertools
+import json
 import os
+import random
 import unittest
 import unittest.mock as mock
 
-from src.gitcal import gitcal, __main__
+from src.gitcal import args, gitcal, gitcommit, logbackend, __main__
+from src.gitcal.bucket import Rollup
+from src.gitcal.commitsource import CommitSource
+from src.gitcal.commitstore import CommitStore
+from src.gitcal.table import CellInfo, Table
+from src.gitcal.tableconfig import TableConfig
+from tests.mock_git import mock_git_output
 
 
 LOG_DIR = os.path.join(os.path.dirname(__file__), 'mocked_data')
@@ -173,6 +185,12 @@ class GitcalTest(unittest.TestCase):
     def test_draw_tables_all_users(self):
         self.assert_draw_tables('git-log-multi-t', ['--no-label', '--all-users'])
 
+    def test_draw_tables_all_users_empty(self):
+        commit_source = CommitSource(commits=CommitStore())
+        argspace, table_configs = args.parse_args(['--all-users', '-T'], commit_source)
+        tables = gitcal.create_tables(argspace, table_configs, commit_source)
+        self.assertEqual(Table.draw_tables(tables), '')
+
     def test_draw_tables_all_users_merge(self):
         self.assert_draw_tables('git-log-multi-t', [
             '--no-label',
@@ -218,6 +236,102 @@ class GitcalTest(unittest.TestCase):
             '-f', 'jsmith'
         ])
 
+    def test_draw_tables_all_users_loads_once(self):
+        fname = os.path.join(LOG_DIR, 'git-log-multi-t.txt')
+        calls = []
+
+        with mock_git_output(fname, calls):
+            __main__.draw_tables_from_args([
+                '--all-users',
+                '-T',
+                '-f', 'jsmith',
+                '-T',
+                '--all-users',
+            ])
+        self.assertEqual(len(calls), 1)
+
+    def test_draw_tables_backend(self):
+        fname = os.path.join(LOG_DIR, 'git-log-multi-t.txt')
+        for argv, backend in [
+            ([], logbackend.LOG_DATES),
+            (['-f', 'jsmith'], logbackend.LOG_AUTHORS),
+            (['--all-users'], logbackend.LOG_AUTHORS),
+            (['--cache'], logbackend.LOG),
+        ]:
+            calls = []
+            with mock_git_output(fname, calls), \
+                mock.patch('src.gitcal.commitcache.update_cache', lambda **kwargs: b''), \
+                mock.patch('src.gitcal.commitcache.update_rollup', lambda **kwargs: Rollup(array('q'), {})):
+                __main__.draw_tables_from_args(argv)
+            self.assertEqual(calls, [] if backend is logbackend.LOG else [backend.args()])
+
+    def test_main_streams_output(self):
+        fname = os.path.join(LOG_DIR, 'git-log-multi-t.txt')
+        for argv in [['--all-users'], ['--start', '2030-01-01']]:
+            with mock_git_output(fname):
+                expected = __main__.draw_tables_from_args(argv) + '\n'
+
+            with mock_git_output(fname), \
+                mock.patch('sys.argv', ['gitcal', *argv]), \
+                mock.patch('sys.stdout', new_callable=io.StringIO) as stdout:
+                __main__.main()
+            self.assertEqual(stdout.getvalue(), expected)
+
+    def test_main_profile(self):
+        fname = os.path.join(LOG_DIR, 'git-log-multi-t.txt')
+        with mock_git_output(fname):
+            expected = __main__.draw_tables_from_args(['--collapse', '2']) + '\n'
+
+        with mock_git_output(fname), \
+            mock.patch('sys.argv', ['gitcal', '--profile', '--collapse', '2']), \
+            mock.patch('sys.stdout', new_callable=io.StringIO) as stdout, \
+            mock.patch('sys.stderr', new_callable=io.StringIO) as stderr:
+            __main__.main()
+        self.assertEqual(stdout.getvalue(), expected)
+
+        report = json.loads(stderr.getvalue())
+        self.assertEqual(set(report['phases']), {'git', 'parse', 'bucket', 'tables', 'collapse', 'render'})
+        for stats in report['phases'].values():
+            self.assertGreaterEqual(stats['seconds'], 0)
+            self.assertIsNotNone(stats['peak_bytes'])
+        self.assertEqual(report['counts']['output_bytes'], len(expected.encode('utf-8')) - 1)
+        self.assertEqual(report['counts']['rows'], len(expected.split('\n')) - 2)
+        self.assertGreater(report['counts']['commits'], 0)
+
+    def test_build_tables(self):
+        fname = os.path.join(LOG_DIR, 'git-log-multi-t.txt')
+        argv = ['--collapse', '2', '-T', '-d', '6h', '-f', 'jsmith', '--num']
+        with mock_git_output(fname):
+            expected = __main__.draw_tables_from_args(argv)
+
+        with open(fname, 'rb') as file:
+            commits = gitcommit.parse_commit_data(file.read())
+        table_configs = [
+            TableConfig(collapse=2),
+            TableConfig(collapse=2, delta=datetime.timedelta(hours=6), filter_names=['jsmith'], num=True),
+        ]
+
+        for source in [commits, iter(commits), CommitStore.from_commits(commits)]:
+            with mock.patch('subprocess.Popen', side_effect=AssertionError('git was run')):
+                tables = gitcal.build_tables(source, table_configs)
+            self.assertEqual(len(tables), 2)
+            self.assertEqual(sum(val for row in tables[0].data for val in row if val > 0), len(commits))
+            self.assertEqual(gitcal.render_tables(tables), expected)
+
+    def test_collapse_tables(self):
+        first = Table(None)
+        first.data = [[1], [0], [0], [0], [2], [0], [0]]
+        first.row_labels = [ 'a%d' % i for i in range(7) ]
+        second = Table(None)
+        second.data = [[0, 0], [0, 0], [0, 0], [0, 3], [0, 0]]
+        second.row_labels = { i: 'b%d' % i for i in range(5) }
+
+        gitcal.collapse_tables([first, second], 2)
+        self.assertEqual(first.data, [[1], [-1], [0], [2], [-1]])
+        self.assertEqual(first.row_labels, ['a0', '', 'a3', 'a4', ''])
+        self.assertEqual(second.data, [[0, 0], [-1, -1], [0, 3], [0, 0]])
+        self.assertEqual(second.row_labels, { 0: 'b0', 3: 'b3', 4: 'b4' })
+
     def test_draw_cell_bordered(self):
         for i in range(5):
             val = 'a' * i
@@ -236,14 +350,25 @@ class GitcalTest(unittest.TestCase):
             self.assertEqual(next(gen), val)
             self.assertRaises(StopIteration, next, gen)
 
+    def test_getclass_determines_getval(self):
+        rand = random.Random(0)
+        for border, color, num in itertools.product([False, True], repeat=3):
+            tbl = Table(CellInfo(width=2, height=1, has_border=border, drawcell=gitcal.draw_cell_unborder))
+            tbl.config = TableConfig(color=color, num=num, threshold=4)
+            tbl.data = [ [ rand.choice([-1, 0, 1, 3, 4, 9, 10, 99, 100, 250]) for _ in range(7) ] for _ in range(40) ]
+
+            values = {}
+            for row_idx, row in enumerate(tbl.data):
+                for col, val in enumerate(row):
+                    key = gitcal.getclass(tbl, val, col, row_idx)
+                    values.setdefault(key, set()).add(gitcal.getval(tbl, val, col, row_idx))
+            for key, vals in values.items():
+                self.assertEqual(len(vals), 1, key)
+
     def assert_draw_tables(self, name, args, print_output=False, write_output=False):
         fname = os.path.join(LOG_DIR, sanitize_filename(name) + '.txt')
 
-        def get_data(args):
-            with open(fname, 'rb') as file:
-                return file.read()
-
-        with mock.patch('subprocess.check_output', get_data):
+        with mock_git_output(fname):
             result = __main__.draw_tables_from_args(args)
 
             if print_output: #pragma: nocover
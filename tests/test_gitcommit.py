@@ -2,9 +2,9 @@ import datetime
 import json
 import os
 import unittest
-import unittest.mock as mock
 
-from src.gitcal import gitcommit
+from src.gitcal import gitcommit, logbackend
+from tests.mock_git import format_log, mock_git_output
 
 
 def mkdtime(string):
@@ -67,15 +67,46 @@ class GitCommitTest(unittest.TestCase):
                 include_year=entry[INCLUDE_YEAR],
             ), entry[RESULT])
 
+    def test_parse_tz_offset(self):
+        self.assertEqual(gitcommit.parse_tz_offset('+0000'), 0)
+        self.assertEqual(gitcommit.parse_tz_offset('+0200'), 7200)
+        self.assertEqual(gitcommit.parse_tz_offset('-0500'), -18000)
+        self.assertEqual(gitcommit.parse_tz_offset('+0530'), 19800)
+        self.assertEqual(gitcommit.parse_tz_offset('-0930'), -34200)
+
+    def test_log_backends(self):
+        with open(os.path.join(LOG_DIR, 'git-log-multi-t.txt'), 'rb') as file:
+            data = file.read()
+        expected = list(gitcommit.iter_parse_commit_records(data.split(b'\n')))
+        utc_times = list(map(lambda x: int(x.split(b' ')[1]), filter(len, data.split(b'\n'))))
+
+        for backend in logbackend.BACKENDS.values():
+            args = backend.args()
+            records = list(backend.iter_records(format_log(data, args).split(b'\n')))
+            self.assertEqual(records, list(map(lambda x: (
+                x[0][0] if backend.has_hashes else '',
+                x[1] if backend.committer_date else x[0][1],
+                x[0][2] if backend.has_names else '',
+            ), zip(expected, utc_times))), backend.name)
+
+        self.assertEqual(logbackend.REV_LIST_DATES.args()[-1], 'HEAD')
+        self.assertEqual(logbackend.REV_LIST_DATES.args('abc', '--not', 'def')[-1], 'def')
+
+    def test_select_backend(self):
+        self.assertIs(logbackend.select_backend(), logbackend.LOG_DATES)
+        self.assertIs(logbackend.select_backend(need_names=True), logbackend.LOG_AUTHORS)
+        self.assertIs(logbackend.select_backend(need_names=True, need_hashes=True), logbackend.LOG)
+        self.assertIs(logbackend.select_backend(committer_date=True), logbackend.LOG_COMMITTER_DATES)
+        self.assertIs(
+            logbackend.select_backend(need_names=True, committer_date=True),
+            logbackend.LOG_COMMITTER_AUTHORS
+        )
+
     def test_get_commit_data(self):
         logfile = os.path.join(LOG_DIR, 'git-log.txt')
 
-        def get_data(args):
-            with open(logfile, 'rb') as file:
-                return file.read()
-
         with open(logfile + '.commits.txt', 'r') as file:
-            with mock.patch('subprocess.check_output', get_data):
+            with mock_git_output(logfile):
                 commits = gitcommit.get_commit_data()
             self.assertEqual(
                 file.read().rstrip('\n'),
@@ -85,10 +116,6 @@ class GitCommitTest(unittest.TestCase):
     def test_get_users_from_commits(self):
         logfile = os.path.join(LOG_DIR, 'git-log-multi.txt')
 
-        def get_data(args):
-            with open(logfile, 'rb') as file:
-                return file.read()
-
-        with mock.patch('subprocess.check_output', get_data):
+        with mock_git_output(logfile):
             users = gitcommit.get_users_from_commits(gitcommit.get_commit_data())
         self.assertEqual(users, set(['WiLGYSeF', 'aaasdf']))
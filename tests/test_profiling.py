@@ -0,0 +1,42 @@
+import time
+import tracemalloc
+import unittest
+
+from src.gitcal.profiling import Profiler, phase
+
+
+class ProfilingTest(unittest.TestCase):
+    def test_nested_phases(self):
+        profiler = Profiler()
+        with profiler.phase('outer'):
+            time.sleep(0.02)
+            with profiler.phase('inner'):
+                data = bytearray(1 << 20)
+                time.sleep(0.02)
+            del data
+        profiler.stop()
+
+        outer = profiler.phases['outer']
+        inner = profiler.phases['inner']
+        self.assertEqual((outer.calls, inner.calls), (1, 1))
+        self.assertGreaterEqual(inner.seconds, 0.02)
+        self.assertGreaterEqual(outer.seconds, 0.02)
+        self.assertLess(outer.seconds, 0.04)
+
+        self.assertGreaterEqual(inner.peak_bytes, 1 << 20)
+        self.assertGreaterEqual(outer.peak_bytes, 1 << 20)
+        self.assertFalse(tracemalloc.is_tracing())
+
+    def test_iter_phase(self):
+        profiler = Profiler(trace_memory=False)
+        self.assertEqual(list(profiler.iter_phase('items', range(3))), [0, 1, 2])
+        self.assertEqual(profiler.phases['items'].calls, 4)
+        self.assertIsNone(profiler.phases['items'].peak_bytes)
+
+    def test_count(self):
+        profiler = Profiler(trace_memory=False)
+        profiler.count('rows', 3)
+        profiler.count('rows')
+        with phase(None, 'ignored'):
+            pass
+        self.assertEqual(profiler.to_dict(), {'phases': {}, 'counts': {'rows': 4}})
@@ -0,0 +1,139 @@
+import asyncio
+import json
+import os
+import tempfile
+import unittest
+import unittest.mock as mock
+
+from src.gitcal import gitcommit, __main__
+from src.gitcal.server import RepoHistory, RequestError, Server
+from tests.test_commitsource import commit
+from tests.test_commitcache import git
+
+
+def run(coro):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coro)
+    finally:
+        loop.close()
+
+
+class ServerTest(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.repo = os.path.join(self.tmpdir.name, 'repo')
+        git('init', '-q', self.repo)
+        commit(self.repo, 'a', '2021-03-01T10:00:00+0000', 'alice')
+        commit(self.repo, 'b', '2021-03-03T10:00:00+0100', 'bob')
+        commit(self.repo, 'c', '2021-03-04T10:00:00-0500', 'alice')
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def expected(self, argv):
+        return __main__.draw_tables_from_args(['--repo', self.repo, *argv])
+
+    def test_render(self):
+        async def test():
+            server = Server([self.repo])
+            await server.start()
+            for argv in [[], ['-d', '6h', '--num'], ['--all-users', '--no-color'], ['-f', 'bob', '-T', '-d', '1h']]:
+                self.assertEqual(await server.render(None, argv), self.expected(argv))
+                self.assertEqual(await server.render(self.repo, argv), self.expected(argv))
+        run(test())
+
+    def test_incremental_refresh(self):
+        async def test():
+            server = Server([self.repo])
+            await server.start()
+
+            commit(self.repo, 'd', '2021-03-02T12:00:00+0000', 'carol')
+            with mock.patch('src.gitcal.gitcommit.git_log', wraps=gitcommit.git_log) as git_log:
+                self.assertEqual(await server.render(None, ['--all-users']), self.expected(['--all-users']))
+                self.assertEqual(await server.render(None, []), self.expected([]))
+            self.assertEqual(git_log.call_count, 1)
+            self.assertIn('--not', git_log.call_args[0])
+        run(test())
+
+    def test_rewritten_history(self):
+        async def test():
+            server = Server([self.repo])
+            await server.start()
+
+            git('-C', self.repo, 'reset', '-q', '--hard', 'HEAD~2')
+            commit(self.repo, 'e', '2021-03-05T10:00:00+0000', 'dave')
+            with mock.patch('src.gitcal.gitcommit.git_log', wraps=gitcommit.git_log) as git_log:
+                self.assertEqual(await server.render(None, ['--all-users']), self.expected(['--all-users']))
+            self.assertNotIn('--not', git_log.call_args[0])
+            self.assertEqual(len(server.get_history(None).commits), 2)
+        run(test())
+
+    def test_shared_refresh(self):
+        async def test():
+            server = Server([self.repo])
+            await server.start()
+
+            commit(self.repo, 'd', '2021-03-02T12:00:00+0000', 'carol')
+            with mock.patch.object(RepoHistory, 'load', autospec=True, side_effect=RepoHistory.load) as load:
+                results = await asyncio.gather(*[ server.render(None, []) for _ in range(5) ])
+            self.assertEqual(load.call_count, 1)
+            self.assertEqual(results, [self.expected([])] * 5)
+        run(test())
+
+    def test_bad_requests(self):
+        async def test():
+            server = Server([self.repo])
+            await server.start()
+            for method, target, body, status in [
+                ('GET', '/render?arg=--no-such-option', b'', 400),
+                ('GET', '/render?arg=-c&arg=x', b'', 400),
+                ('GET', '/render?arg=--repo&arg=%s' % self.repo, b'', 400),
+                ('GET', '/render?arg=--committer-date', b'', 400),
+                ('GET', '/render?arg=--cache', b'', 400),
+                ('GET', '/render?arg=--shards&arg=4', b'', 400),
+                ('GET', '/render?arg=--profile', b'', 400),
+                ('GET', '/render?arg=--watch', b'', 400),
+                ('GET', '/render?repo=%s' % self.tmpdir.name, b'', 404),
+                ('GET', '/other', b'', 404),
+                ('POST', '/render', b'not json', 400),
+                ('POST', '/render', b'{"args": [1]}', 400),
+                ('PUT', '/render', b'', 405),
+            ]:
+                with self.assertRaises(RequestError) as ctx:
+                    await server.handle_request(method, target, body)
+                self.assertEqual(ctx.exception.status, status, target)
+        run(test())
+
+    def test_http(self):
+        socket_path = os.path.join(self.tmpdir.name, 'gitcal.sock')
+
+        async def request(data):
+            reader, writer = await asyncio.open_unix_connection(socket_path)
+            writer.write(data)
+            response = await reader.read()
+            writer.close()
+            head, _, body = response.partition(b'\r\n\r\n')
+            return int(head.split()[1]), body.decode('utf-8')
+
+        async def test():
+            listener = await Server([self.repo]).listen(socket_path=socket_path)
+            try:
+                self.assertEqual(
+                    await request(b'GET /render?arg=-d&arg=12h HTTP/1.1\r\nHost: localhost\r\n\r\n'),
+                    (200, self.expected(['-d', '12h']))
+                )
+
+                body = json.dumps({'repo': self.repo, 'args': ['--all-users']}).encode('utf-8')
+                self.assertEqual(
+                    await request(b'POST /render HTTP/1.1\r\nContent-Length: %d\r\n\r\n%s' % (len(body), body)),
+                    (200, self.expected(['--all-users']))
+                )
+
+                status, body = await request(b'GET /render?arg=--no-such-option HTTP/1.1\r\n\r\n')
+                self.assertEqual(status, 400)
+                self.assertIn('usage:', body)
+            finally:
+                listener.close()
+                await listener.wait_closed()
+        run(test())
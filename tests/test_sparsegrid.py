@@ -0,0 +1,32 @@
+import unittest
+
+from src.gitcal.sparsegrid import SparseGrid
+
+
+class SparseGridTest(unittest.TestCase):
+    def test_from_buckets(self):
+        grid = SparseGrid.from_buckets({0: 1, 5: 2, 6: 3}, 4, 3)
+        self.assertEqual(len(grid), 4)
+        self.assertEqual(grid.nonempty_rows(), [0, 1, 2])
+        self.assertEqual(list(grid), [[1, 0, 0], [0, 0, 2], [3, 0, 0], [0, 0, 0]])
+        self.assertEqual(grid, [[1, 0, 0], [0, 0, 2], [3, 0, 0], [0, 0, 0]])
+        self.assertNotEqual(grid, [[1, 0, 0], [0, 0, 2], [3, 0, 0]])
+
+    def test_indexing(self):
+        grid = SparseGrid(5, 2, {1: [1, 2], 3: [3, 4]})
+        self.assertEqual(grid[1], [1, 2])
+        self.assertEqual(grid[2], [0, 0])
+        self.assertEqual(grid[-2], [3, 4])
+        self.assertEqual(grid[1:4], [[1, 2], [0, 0], [3, 4]])
+        self.assertEqual(grid[::2], [[0, 0], [0, 0], [0, 0]])
+
+        with self.assertRaises(IndexError):
+            grid[5] # pylint: disable=pointless-statement
+
+    def test_collapse(self):
+        grid = SparseGrid(10, 1, {0: [1], 4: [2], 5: [3]})
+        collapsed = grid.collapse([(1, 4), (6, 10)])
+        self.assertEqual(collapsed, [[1], [-1], [2], [3], [-1]])
+        self.assertEqual(collapsed.nonempty_rows(), [0, 1, 2, 3, 4])
+
+        self.assertEqual(grid.collapse([]), grid)
@@ -14,6 +14,13 @@ class TableTest(unittest.TestCase):
     def test_empty_table(self):
         self.assert_from_file('empty')
 
+    def test_empty_table_with_name(self):
+        fname = os.path.join(TABLES_DIR, 'empty' + '.txt')
+        tbl = create_table_from_file(fname, border=True)
+        tbl.table_name = 'empty'
+        self.assertEqual(Table.draw_tables([ tbl ]), '')
+        self.assertEqual(Table.draw_tables_lines([ tbl, tbl ]), [])
+
     def test_2x2a_table(self):
         self.assert_from_file('2x2a')
 
@@ -31,6 +38,21 @@ class TableTest(unittest.TestCase):
         tbl = create_table_from_file(fname, border=False)
         self.assertEqual(tbl.max_length(), 8)
 
+    def test_6x4a_table_layout_invalidated(self):
+        fname = os.path.join(TABLES_DIR, '6x4a-label-some-left' + '.txt')
+        tbl = create_table_from_file(fname, border=True)
+        self.assertEqual(tbl.max_length(), 18)
+        self.assertIs(tbl.layout, tbl.layout)
+
+        tbl.cell_info = cell_unborder
+        self.assertEqual(tbl.max_length(), 13)
+
+        tbl.row_labels = {}
+        self.assertEqual(tbl.max_length(), 8)
+
+        tbl.table_name = 'a long table name'
+        self.assertEqual(tbl.max_length(), 17)
+
     def test_6x4a_label_table(self):
         self.assert_from_file('6x4a-label')
 
@@ -0,0 +1,116 @@
+import io
+import os
+import re
+import tempfile
+import unittest
+import unittest.mock as mock
+
+from src.gitcal import gitcommit, watch, __main__
+from src.gitcal.commitsource import CommitSource
+from src.gitcal.history import RepoHistory
+from src.gitcal.table import Table
+from tests.test_commitsource import commit
+from tests.test_commitcache import git
+
+
+class WatchTest(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.repo = os.path.join(self.tmpdir.name, 'repo')
+        git('init', '-q', self.repo)
+        commit(self.repo, 'a', '2021-03-01T10:00:00+0000', 'alice')
+        commit(self.repo, 'b', '2021-03-03T10:00:00+0100', 'bob')
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def assert_watcher_matches(self, watcher, argv):
+        self.assertEqual(
+            Table.draw_tables(watcher.tables(), spacing=2),
+            __main__.draw_tables_from_args(['--repo', self.repo, *argv])
+        )
+
+    def test_watcher(self):
+        argv = ['-d', '6h', '--collapse', '2', '-T', '-f', 'bob', '--num']
+        watcher = watch.TableWatcher(argv, [RepoHistory(self.repo)])
+
+        self.assertTrue(watcher.update())
+        self.assert_watcher_matches(watcher, argv)
+        self.assertFalse(watcher.update())
+
+        # only the new commits are read, including one dated before the others
+        commit(self.repo, 'c', '2021-03-05T10:00:00+0000', 'bob')
+        commit(self.repo, 'd', '2021-02-27T10:00:00+0000', 'alice')
+        with mock.patch('src.gitcal.gitcommit.git_log', wraps=gitcommit.git_log) as git_log:
+            self.assertTrue(watcher.update())
+        self.assertIn('--not', git_log.call_args[0])
+        self.assert_watcher_matches(watcher, argv)
+
+        git('-C', self.repo, 'reset', '-q', '--hard', 'HEAD~3')
+        commit(self.repo, 'e', '2021-03-02T10:00:00+0000', 'bob')
+        self.assertTrue(watcher.update())
+        self.assertEqual(watcher.plan.commit_count, 2)
+        self.assert_watcher_matches(watcher, argv)
+
+    def test_watcher_all_users(self):
+        argv = ['--all-users', '-d', '12h', '--num']
+        watcher = watch.TableWatcher(argv, [RepoHistory(self.repo)])
+        self.assertTrue(watcher.update())
+        self.assert_watcher_matches(watcher, argv)
+        self.assertEqual(list(map(lambda x: x.end_time, watcher.counters)), [None, None])
+
+        # commits after the end of the history when watching started are counted
+        commit(self.repo, 'c', '2021-03-06T10:00:00+0000', 'bob')
+        self.assertTrue(watcher.update())
+        self.assert_watcher_matches(watcher, argv)
+        self.assertEqual(list(map(lambda x: sum(x.counts.values()), watcher.counters)), [1, 2])
+
+        # authors who first commit while watching get a table
+        commit(self.repo, 'd', '2021-03-07T10:00:00+0000', 'carol')
+        self.assertTrue(watcher.update())
+        self.assertEqual(list(map(lambda x: x.tbl_name, watcher.drawn_configs)), ['alice', 'bob', 'carol'])
+        self.assert_watcher_matches(watcher, argv)
+
+    def test_redraw_lines(self):
+        file = io.StringIO()
+        watch.redraw_lines(file, ['a', 'b', 'c'], ['a', 'x', 'c', 'd'])
+        self.assertEqual(file.getvalue(), '\x1b[2;1Hx\x1b[K\x1b[4;1Hd\x1b[K')
+
+        file = io.StringIO()
+        watch.redraw_lines(file, ['a', 'b', 'c'], ['a'])
+        self.assertEqual(file.getvalue(), '\x1b[2;1H\x1b[J')
+
+    def test_watch(self):
+        argv = ['--repo', self.repo, '--all-users', '--watch', '5']
+        commit_source = CommitSource()
+        argspace = __main__.parse_source_args(argv, commit_source)
+        self.assertEqual(argspace.watch, 5)
+        first_lines = __main__.draw_tables_from_args(['--repo', self.repo, '--all-users']).split('\n')[:-1]
+
+        sleeps = []
+        def sleep(seconds):
+            sleeps.append(seconds)
+            if len(sleeps) == 1:
+                commit(self.repo, 'c', '2021-03-02T10:00:00+0000', 'bob')
+            elif len(sleeps) == 3:
+                raise KeyboardInterrupt()
+
+        file = io.StringIO()
+        with mock.patch('time.sleep', sleep), \
+            mock.patch('src.gitcal.gitcommit.git_log', wraps=gitcommit.git_log) as git_log, \
+            self.assertRaises(KeyboardInterrupt):
+            watch.watch(argv, commit_source, file, argspace.watch)
+        self.assertEqual(sleeps, [5, 5, 5])
+
+        # the history is only read by the watcher, once in full and then the new commit
+        self.assertEqual(git_log.call_count, 2)
+        self.assertIn('--not', git_log.call_args[0])
+
+        output = file.getvalue()
+        self.assertTrue(output.startswith(watch.HIDE_CURSOR + watch.CLEAR_SCREEN))
+        self.assertTrue(output.endswith(watch.SHOW_CURSOR))
+
+        # the first draw writes every line, the second only the row of the new commit
+        positions = re.findall(r'\x1b\[(\d+);1H', output)
+        self.assertEqual(positions[:len(first_lines)], [ str(idx + 1) for idx in range(len(first_lines)) ])
+        self.assertEqual(len(positions), len(first_lines) + 2)